@@ -12,6 +12,7 @@ Salida:
  - rutas.geojson
  - estaciones.geojson
  - grafo_bipartito.json
+ - horarios.bin (conexiones ordenadas por hora para horarios.py)
 """
 
 import json
@@ -23,11 +24,16 @@ from shapely.geometry import LineString, Point, mapping
 import networkx as nx
 from tqdm import tqdm
 
+from horarios import construir_horarios
+
 # ------------ Config ------------
 INPUT_DIR = Path('.venv\ETF\Data_whitout_Process') 
 OUT_RUTAS = Path('rutas.geojson')
 OUT_ESTACIONES = Path('estaciones.geojson')
 OUT_GRAFO = Path('grafo_bipartito.json')
+OUT_HORARIOS = Path('horarios.bin')
+# Un archivo por nivel de detalle: rutas_z11.geojson, rutas_z13.geojson, ...
+OUT_RUTAS_LOD = 'rutas_{nivel}.geojson'
 
 # Nombres de archivos GTFS
 F_ROUTES = INPUT_DIR / 'routes.txt'
@@ -62,14 +68,15 @@ def route_type_normalize(s):
 
 # --------------------------------
 
-def main():
+def cargar_gtfs(input_dir=INPUT_DIR):
     # Cargar archivos (pandas)
     print("Cargando archivos GTFS (esto puede tardar si son grandes)...")
-    routes = pd.read_csv(F_ROUTES, dtype=str)
-    shapes = pd.read_csv(F_SHAPES, dtype=str)
-    trips = pd.read_csv(F_TRIPS, dtype=str)
-    stop_times = pd.read_csv(F_STOP_TIMES, dtype=str)
-    stops = pd.read_csv(F_STOPS, dtype=str)
+    input_dir = Path(input_dir)
+    routes = pd.read_csv(input_dir / F_ROUTES.name, dtype=str)
+    shapes = pd.read_csv(input_dir / F_SHAPES.name, dtype=str)
+    trips = pd.read_csv(input_dir / F_TRIPS.name, dtype=str)
+    stop_times = pd.read_csv(input_dir / F_STOP_TIMES.name, dtype=str)
+    stops = pd.read_csv(input_dir / F_STOPS.name, dtype=str)
 
     # Normalizaciones de columnas (por si hay espacios u otros nombres)
     # asumimos que las columnas vienen como el estándar: route_id, shape_id, stop_id, etc.
@@ -82,6 +89,10 @@ def main():
     if 'stop_sequence' in stop_times.columns:
         stop_times['stop_sequence'] = pd.to_numeric(stop_times['stop_sequence'], errors='coerce')
 
+    return routes, shapes, trips, stop_times, stops
+
+
+def elegir_shapes(routes, trips, stop_times):
     # ---------- Elegir shape representativo por route ----------
     print("Elegiendo shape representativo por route_id...")
     # trips: route_id, trip_id, shape_id
@@ -124,6 +135,10 @@ def main():
 
         route_to_shape[route] = chosen_shape
 
+    return route_to_shape, trip_stop_counts
+
+
+def construir_rutas(routes, shapes, trips, stop_times, stops, route_to_shape, trip_stop_counts):
     # ---------- Construir rutas.geojson desde shapes ----------
     print("Construyendo rutas.geojson desde shapes...")
     # Pre-agrupamos shapes por shape_id y ordenamos por sequence
@@ -201,8 +216,34 @@ def main():
                     # no coordinates -> saltar
                     pass
 
-    save_geojson_featurecollection(rutas_features, OUT_RUTAS)
+    return rutas_features
+
+
+def construir_lod(rutas_features, metodo='douglas_peucker'):
+    """
+    Versiones simplificadas de rutas_features, una por nivel de NIVELES_LOD
+    (salvo el completo, que es rutas.geojson).
+    """
+    from simplificacion import NIVELES_LOD, simplificar_coordenadas
+
+    print("Simplificando geometrías por nivel de detalle...")
+    niveles = {}
+    for _, nivel, tol in NIVELES_LOD:
+        if tol <= 0:
+            continue
+        features = []
+        for f in rutas_features:
+            coords = simplificar_coordenadas(f["geometry"]["coordinates"], tol, metodo)
+            features.append({**f, "geometry": {**f["geometry"], "coordinates": coords}})
+        niveles[nivel] = features
+    return niveles
+
+
+def contar_vertices(features):
+    return sum(len(f["geometry"]["coordinates"]) for f in features)
 
+
+def construir_estaciones(routes, trips, stop_times, stops):
     # ---------- Construir estaciones.geojson tipificadas ----------
     print("Construyendo estaciones.geojson y clasificando por tipo (segun rutas que pasan)...")
     # Primero, para cada stop_id, averiguar los route_ids que lo usan
@@ -266,9 +307,11 @@ def main():
         }
         estaciones_features.append(feature)
 
-    save_geojson_featurecollection(estaciones_features, OUT_ESTACIONES)
     print("Conteo de tipos de paraderos:", stop_type_counts)
+    return estaciones_features, route_tipo, trip_to_route
+
 
+def construir_grafo_bipartito(routes, stops, stop_times, route_tipo, trip_to_route):
     # ---------- Construir grafo bipartito route <-> stop ----------
     print("Construyendo grafo bipartito (route <-> stop) con pesos (apariciones)...")
     G = nx.Graph()
@@ -304,10 +347,45 @@ def main():
     for u, v, data in G.edges(data=True):
         out_graph['edges'].append({"u": u, "v": v, **data})
 
-    with open(OUT_GRAFO, 'w', encoding='utf-8') as f:
+    return out_graph
+
+
+def main(input_dir=INPUT_DIR, out_dir=Path('.')):
+    out_dir = Path(out_dir)
+    routes, shapes, trips, stop_times, stops = cargar_gtfs(input_dir)
+
+    route_to_shape, trip_stop_counts = elegir_shapes(routes, trips, stop_times)
+
+    rutas_features = construir_rutas(routes, shapes, trips, stop_times, stops,
+                                     route_to_shape, trip_stop_counts)
+    save_geojson_featurecollection(rutas_features, out_dir / OUT_RUTAS)
+
+    vertices_completo = contar_vertices(rutas_features)
+    bytes_completo = (out_dir / OUT_RUTAS).stat().st_size
+    for nivel, features in construir_lod(rutas_features).items():
+        path = out_dir / OUT_RUTAS_LOD.format(nivel=nivel)
+        # Sin indentación: estos archivos son para servir, no para leer
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        vertices = contar_vertices(features)
+        print(f"Guardado: {path} | vertices {vertices}/{vertices_completo} "
+              f"({100 * vertices / max(vertices_completo, 1):.1f}%) | "
+              f"{path.stat().st_size} bytes ({100 * path.stat().st_size / bytes_completo:.1f}% de {OUT_RUTAS})")
+
+    estaciones_features, route_tipo, trip_to_route = construir_estaciones(routes, trips, stop_times, stops)
+    save_geojson_featurecollection(estaciones_features, out_dir / OUT_ESTACIONES)
+
+    out_graph = construir_grafo_bipartito(routes, stops, stop_times, route_tipo, trip_to_route)
+    with open(out_dir / OUT_GRAFO, 'w', encoding='utf-8') as f:
         json.dump(out_graph, f, ensure_ascii=False, indent=2)
 
-    print(f"Guardado: {OUT_GRAFO}")
+    print(f"Guardado: {out_dir / OUT_GRAFO}")
+
+    print("Construyendo horarios (conexiones entre paraderos consecutivos)...")
+    horarios = construir_horarios(stop_times, trips)
+    horarios.guardar(out_dir / OUT_HORARIOS)
+    print(f"Guardado: {out_dir / OUT_HORARIOS} ({len(horarios)} conexiones)")
     print("Proceso finalizado.")
 
 if __name__ == '__main__':
@@ -0,0 +1,261 @@
+"""
+Suite de benchmarks sobre datos sintéticos (ver generador_sintetico.py).
+
+Casos:
+ - etf:        etapas de ETF.main sobre un feed GTFS sintético.
+ - grafo:      Grafo.cargar_desde_json, build_nx_from_grafo, widest_path y
+               shortest_path_with_capacity_threshold.
+ - btree:      insert (con su autoguardado), search, save y load del BTreeStore.
+ - conflictos: construir_grafo_conflictos sobre rutas guardadas.
+ - horarios:   construcción, carga y consultas de llegada más temprana.
+ - asignacion: compilación del grafo, todo-o-nada y Frank-Wolfe con n/5 pares.
+
+Los resultados se escriben en JSON para comparar entre versiones:
+    python benchmark.py --tamanos 1000 10000 --salida antes.json
+    python benchmark.py --tamanos 1000 10000 --salida despues.json --comparar antes.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generador_sintetico import generar_grafo, generar_gtfs
+
+CASOS = ["etf", "grafo", "btree", "conflictos", "horarios", "asignacion"]
+
+
+class Cronometro:
+    def __init__(self, caso: str, tamano: int, resultados: list):
+        self.caso = caso
+        self.tamano = tamano
+        self.resultados = resultados
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str, **extra):
+        inicio = time.perf_counter()
+        yield
+        segundos = time.perf_counter() - inicio
+        self.resultados.append({"caso": self.caso, "tamano": self.tamano, "etapa": nombre,
+                                "segundos": round(segundos, 6), **extra})
+        # sys.__stdout__ porque las etapas de ETF corren con stdout silenciado
+        print(f"  {self.caso:10s} {self.tamano:>9d}  {nombre:40s} {segundos:10.4f} s", file=sys.__stdout__)
+
+
+def bench_etf(n: int, resultados: list) -> None:
+    import ETF
+
+    c = Cronometro("etf", n, resultados)
+    silencio = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        filas = generar_gtfs(tmp, n_paradas=n)
+        with contextlib.redirect_stdout(silencio), contextlib.redirect_stderr(silencio):
+            with c.etapa("cargar_gtfs", filas_stop_times=filas["stop_times.txt"]):
+                routes, shapes, trips, stop_times, stops = ETF.cargar_gtfs(tmp)
+            with c.etapa("elegir_shapes"):
+                route_to_shape, trip_stop_counts = ETF.elegir_shapes(routes, trips, stop_times)
+            with c.etapa("construir_rutas"):
+                ETF.construir_rutas(routes, shapes, trips, stop_times, stops, route_to_shape, trip_stop_counts)
+            with c.etapa("construir_estaciones"):
+                _, route_tipo, trip_to_route = ETF.construir_estaciones(routes, trips, stop_times, stops)
+            with c.etapa("construir_grafo_bipartito"):
+                ETF.construir_grafo_bipartito(routes, stops, stop_times, route_tipo, trip_to_route)
+
+
+def bench_grafo(n: int, resultados: list) -> None:
+    from Grafo_Respose import Grafo
+    from dkistra import build_nx_from_grafo, widest_path, shortest_path_with_capacity_threshold
+
+    c = Cronometro("grafo", n, resultados)
+    payload = generar_grafo(n)
+    aristas = sum(len(v) for v in payload["aristas"].values())
+    origen, destino = "N0", f"N{n - 1}"
+
+    with c.etapa("Grafo.cargar_desde_json", aristas=aristas):
+        g = Grafo()
+        g.cargar_desde_json(payload)
+    with c.etapa("build_nx_from_grafo", aristas=aristas):
+        G = build_nx_from_grafo(g)
+    with c.etapa("widest_path"):
+        bottleneck, _ = widest_path(G, origen, destino)
+    with c.etapa("shortest_path_with_capacity_threshold"):
+        shortest_path_with_capacity_threshold(G, origen, destino, bottleneck)
+
+
+def _valor_ruta(rnd: random.Random, n_nodos: int, largo: int = 20) -> dict:
+    inicio = rnd.randrange(n_nodos)
+    nodos = [{"id": f"N{(inicio + k * rnd.randrange(1, 50)) % n_nodos}"} for k in range(largo)]
+    return {"ok": True, "camino": [x["id"] for x in nodos], "subgrafo": {"nodes": nodos, "edges": []}}
+
+
+def bench_btree(n: int, resultados: list, n_claves: int) -> None:
+    from btree_storage import BTreeStore
+
+    c = Cronometro("btree", n, resultados)
+    rnd = random.Random(0)
+    claves = [f"N{rnd.randrange(n)}->N{rnd.randrange(n)}" for _ in range(n_claves)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "btree_store.json")
+        bt = BTreeStore(t=2, file_path=path)
+        # insert guarda el archivo completo en cada llamada
+        with c.etapa("insert+save", claves=n_claves):
+            for k in claves:
+                bt.insert(k, _valor_ruta(rnd, n))
+        with c.etapa("search", claves=n_claves):
+            for k in claves:
+                bt.search(k)
+        with c.etapa("save"):
+            bt.save()
+        resultados[-1]["bytes"] = Path(path).stat().st_size
+        with c.etapa("load_or_create"):
+            BTreeStore.load_or_create(path)
+
+
+def bench_conflictos(n: int, resultados: list) -> None:
+    from btree_storage import BTreeStore, BTreeNode
+    from planificacion import construir_grafo_conflictos
+
+    c = Cronometro("conflictos", n, resultados)
+    rnd = random.Random(0)
+    n_rutas = max(10, n // 10)
+    # Una sola hoja con t grande sigue siendo un Árbol B válido y evita
+    # los n autoguardados de insert
+    bt = BTreeStore(t=n_rutas, file_path="/dev/null")
+    claves = sorted({f"R{i}" for i in range(n_rutas)})
+    bt.root = BTreeNode(keys=claves, values=[_valor_ruta(rnd, n) for _ in claves], leaf=True)
+    with c.etapa("construir_grafo_conflictos", rutas=n_rutas):
+        conflictos = construir_grafo_conflictos(bt)
+    resultados[-1]["aristas_conflicto"] = sum(len(v) for v in conflictos.values()) // 2
+
+
+def bench_horarios(n: int, resultados: list, consultas: int = 100) -> None:
+    import ETF
+    from horarios import Horarios, construir_horarios
+
+    c = Cronometro("horarios", n, resultados)
+    silencio = io.StringIO()
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Red más densa que la de bench_etf para que la mayoría de los pares sea alcanzable
+        generar_gtfs(tmp, n_paradas=n, viajes_por_ruta=30)
+        with contextlib.redirect_stdout(silencio):
+            routes, shapes, trips, stop_times, stops = ETF.cargar_gtfs(tmp)
+        with c.etapa("construir_horarios", filas_stop_times=len(stop_times)):
+            h = construir_horarios(stop_times, trips)
+        path = Path(tmp) / "horarios.bin"
+        with c.etapa("guardar", conexiones=len(h)):
+            h.guardar(path)
+        with c.etapa("cargar"):
+            h = Horarios.cargar(path)
+
+    pares = [(rnd.choice(h.paradas), rnd.choice(h.paradas)) for _ in range(consultas)]
+    tiempos = []
+    alcanzables = 0
+    for o, d in pares:
+        inicio = time.perf_counter()
+        alcanzables += h.llegada_mas_temprana(o, d, "06:00:00")["ok"]
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    for nombre, valor in (("consulta_mediana", tiempos[len(tiempos) // 2]),
+                          ("consulta_p95", tiempos[int(len(tiempos) * 0.95)])):
+        resultados.append({"caso": "horarios", "tamano": n, "etapa": nombre, "segundos": round(valor, 6),
+                           "consultas": consultas, "alcanzables": alcanzables})
+        print(f"  {'horarios':10s} {n:>9d}  {nombre:40s} {valor:10.4f} s", file=sys.__stdout__)
+
+
+def bench_asignacion(n: int, resultados: list, iteraciones: int = 10) -> None:
+    import numpy as np
+    from Grafo_Respose import Grafo
+    from asignacion import GrafoCompilado, asignar_capacidad, todo_o_nada
+
+    c = Cronometro("asignacion", n, resultados)
+    rnd = random.Random(0)
+    g = Grafo()
+    g.cargar_desde_json(generar_grafo(n))
+    n_pares = max(10, n // 5)
+    pares = [(f"N{rnd.randrange(n)}", f"N{rnd.randrange(n)}", rnd.uniform(1, 10)) for _ in range(n_pares)]
+    with c.etapa("compilar"):
+        cg = GrafoCompilado(g)
+    origenes = np.array([cg.indice[o] for o, _, _ in pares])
+    destinos = np.array([cg.indice[d] for _, d, _ in pares])
+    with c.etapa("todo_o_nada", pares=n_pares):
+        todo_o_nada(cg, cg.longitud, origenes, destinos, np.array([q for _, _, q in pares]))
+    with c.etapa(f"frank_wolfe_{iteraciones}_iteraciones", pares=n_pares):
+        r = asignar_capacidad(g, pares, max_iteraciones=iteraciones, brecha_objetivo=0.0, tiempo_limite=600)
+    resultados[-1]["brecha_relativa"] = r["resumen"]["brecha_relativa"]
+
+
+def _version() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+
+def comparar(actuales: list, base_path: str) -> None:
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    previos = {(r["caso"], r["tamano"], r["etapa"]): r["segundos"] for r in base["resultados"]}
+    print(f"\nComparación contra {base_path} (versión {base['meta'].get('version')}):")
+    for r in actuales:
+        antes = previos.get((r["caso"], r["tamano"], r["etapa"]))
+        if not antes:
+            continue
+        ratio = r["segundos"] / antes
+        marca = "  <-- más lento" if ratio > 1.2 else ""
+        print(f"  {r['caso']:10s} {r['tamano']:>9d}  {r['etapa']:40s} x{ratio:6.2f}{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", nargs="*", type=int, default=[1_000, 10_000],
+                        help="paraderos (etf) / nodos (grafo, btree, conflictos); hasta 1M")
+    parser.add_argument("--casos", nargs="*", default=CASOS, choices=CASOS)
+    parser.add_argument("--claves-btree", type=int, default=200,
+                        help="inserciones en el caso btree (cada una reescribe el archivo)")
+    parser.add_argument("--salida", default="bench_resultados.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    resultados = []
+    for n in args.tamanos:
+        if "etf" in args.casos:
+            bench_etf(n, resultados)
+        if "grafo" in args.casos:
+            bench_grafo(n, resultados)
+        if "btree" in args.casos:
+            bench_btree(n, resultados, args.claves_btree)
+        if "conflictos" in args.casos:
+            bench_conflictos(n, resultados)
+        if "horarios" in args.casos:
+            bench_horarios(n, resultados)
+        if "asignacion" in args.casos:
+            bench_asignacion(n, resultados)
+
+    salida = {
+        "meta": {
+            "version": _version(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "plataforma": platform.platform(),
+        },
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2)
+    print(f"Guardado: {args.salida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compara las estrategias de coloreo de planificacion.py sobre grafos de
+conflictos sintéticos.
+
+Cada ruta sintética es un recorrido aleatorio de LARGO_RUTA paraderos sobre
+una grilla, así las rutas cercanas comparten paraderos como en una ciudad.
+
+Uso:
+    python benchmark_coloreo.py                 # 10k, 50k y 100k rutas
+    python benchmark_coloreo.py 20000 --salida coloreo.json
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+from planificacion import ESTRATEGIAS_COLOREO, conflictos_desde_indice
+
+
+LARGO_RUTA = 12
+PARADEROS_POR_RUTA = 3  # tamaño de la grilla relativo al número de rutas
+
+
+def grafo_conflictos_sintetico(n_rutas: int, semilla: int = 0) -> dict:
+    rnd = random.Random(semilla)
+    lado = max(2, int((n_rutas * PARADEROS_POR_RUTA) ** 0.5))
+    pasos = ((1, 0), (-1, 0), (0, 1), (0, -1))
+    rutas_por_nodo = defaultdict(set)
+    claves = []
+    for i in range(n_rutas):
+        clave = f"R{i}"
+        claves.append(clave)
+        x, y = rnd.randrange(lado), rnd.randrange(lado)
+        for _ in range(LARGO_RUTA):
+            rutas_por_nodo[x * lado + y].add(clave)
+            dx, dy = rnd.choice(pasos)
+            x = min(lado - 1, max(0, x + dx))
+            y = min(lado - 1, max(0, y + dy))
+    return conflictos_desde_indice(rutas_por_nodo, claves)
+
+
+def medir(estrategia: str, conflictos: dict) -> dict:
+    fn = ESTRATEGIAS_COLOREO[estrategia]
+
+    inicio = time.perf_counter()
+    colores = fn(conflictos)
+    segundos = time.perf_counter() - inicio
+
+    # Memoria en una segunda corrida: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    fn(conflictos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "estrategia": estrategia,
+        "colores": len(set(colores.values())),
+        "segundos": round(segundos, 4),
+        "memoria_pico_mb": round(pico / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tamanos", nargs="*", type=int, default=[10_000, 50_000, 100_000])
+    parser.add_argument("--estrategias", nargs="*", default=list(ESTRATEGIAS_COLOREO))
+    parser.add_argument("--salida", help="archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    for n in args.tamanos:
+        conflictos = grafo_conflictos_sintetico(n)
+        aristas = sum(len(v) for v in conflictos.values()) // 2
+        print(f"\n{n} rutas, {aristas} aristas de conflicto")
+        for estrategia in args.estrategias:
+            r = medir(estrategia, conflictos)
+            r.update({"rutas": n, "aristas_conflicto": aristas})
+            resultados.append(r)
+            print(f"  {estrategia:16s} colores={r['colores']:3d}  "
+                  f"{r['segundos']:8.3f} s  pico={r['memoria_pico_mb']:8.2f} MB")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Guardado: {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
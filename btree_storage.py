@@ -1,9 +1,13 @@
 from __future__ import annotations
 import json
+import os
+import tempfile
 import time
 from dataclasses import dataclass, field
 from typing import Any, List, Optional, Dict
 
+from metricas import BTREE_BYTES, BTREE_GUARDADOS
+
 
 @dataclass
 class BTreeNode:
@@ -62,23 +66,27 @@ class BTreeStore:
     
 
     
-    def insert(self, key: str, value: Any) -> None:
+    def insert(self, key: str, value: Any, guardar: bool = True) -> bool:
         """
         Inserto (key, value) en el Árbol B.
         Casos:
         - Si root no existe → se crea un nodo hoja nuevo.
         - Si la clave ya existe → actualiza el valor.
         - Si la raíz está llena → la divide antes de insertar.
+        Con guardar=False no se reescribe el archivo (lo hace quien llame a save()).
+        Devuelve True si la clave es nueva.
         """
         if self.root is None:
             self.root = BTreeNode(keys=[key], values=[value], leaf=True)
-            self.save()
-            return
+            if guardar:
+                self.save()
+            return True
         # if key exists, replace value
         if self.search(key) is not None:
             self._replace(self.root, key, value)
-            self.save()
-            return
+            if guardar:
+                self.save()
+            return False
 
         max_keys = 2 * self.t - 1
         if len(self.root.keys) == max_keys:
@@ -86,7 +94,22 @@ class BTreeStore:
             self._split_child(s, 0)
             self.root = s
         self._insert_non_full(self.root, key, value)
-        self.save()
+        if guardar:
+            self.save()
+        return True
+
+    def items(self):
+        """Recorre (clave, valor) en orden de clave."""
+        def rec(node):
+            for i, key in enumerate(node.keys):
+                if not node.leaf:
+                    yield from rec(node.children[i])
+                yield key, node.values[i]
+            if not node.leaf:
+                yield from rec(node.children[-1])
+
+        if self.root is not None:
+            yield from rec(self.root)
 
     #Reemplaza el valor asociado a una clave ya existente.
     def _replace(self, node: BTreeNode, key: str, value: Any) -> bool:
@@ -162,9 +185,26 @@ class BTreeStore:
         return bt
 
     # Autoguardado del árbol en un archivo JSON.
+    # Se escribe a un temporal y se reemplaza de forma atómica para que los
+    # lectores concurrentes nunca vean un archivo a medio escribir.
     def save(self) -> None:
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        # Temporal único por escritor: varios procesos pueden guardar el mismo árbol a la vez
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_path)),
+                                        prefix=f"{os.path.basename(self.file_path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(f'{{"t":{self.t},"root":')
+                if self.root is None:
+                    f.write("null")
+                else:
+                    _volcar_nodo(self.root, f)
+                f.write(f',"file_path":{_json(self.file_path)}}}')
+            BTREE_BYTES.inc(os.path.getsize(tmp_path))
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        BTREE_GUARDADOS.inc()
 
     def load(self) -> None:
         with open(self.file_path, "r", encoding="utf-8") as f:
@@ -190,6 +230,29 @@ class BTreeStore:
             return cls(t=t, file_path=file_path)
 
 
+# Mismo JSON que json.dumps(to_dict()) compacto, pero valor por valor: cada
+# json.dumps usa el codificador en C y suelta el GIL entre valores, así un
+# árbol grande no frena al resto del proceso (el event loop de la API)
+# durante todo el volcado. Con indent o json.dump se usaría el codificador
+# de Python puro, ~10 veces más lento.
+def _json(x: Any) -> str:
+    return json.dumps(x, ensure_ascii=False, separators=(",", ":"))
+
+
+def _volcar_nodo(node: BTreeNode, f) -> None:
+    f.write(f'{{"keys":{_json(node.keys)},"values":[')
+    for i, v in enumerate(node.values):
+        if i:
+            f.write(",")
+        f.write(_json(v))
+    f.write('],"children":[')
+    for i, c in enumerate(node.children):
+        if i:
+            f.write(",")
+        _volcar_nodo(c, f)
+    f.write(f'],"leaf":{_json(node.leaf)}}}')
+
+
 # Guarda un subgrafo bajo la clave especificada dentro del B-Tree persistente.
 
 def guardar_subgrafo(clave: str, subgrafo: Dict[str, Any], store_path: str = "btree_store.json", t: int = 2) -> None:
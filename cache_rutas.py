@@ -0,0 +1,180 @@
+"""
+Memoización de resultados de /camino_optimo.
+
+La clave combina el hash del cuerpo crudo del request (grafo, par
+origen-destino y zoom tal como llegaron), el par origen-destino y las
+opciones del algoritmo, así un resultado nunca se sirve para un grafo
+distinto al que lo produjo. Un mismo grafo enviado con otro orden de claves
+solo cuesta un miss. Se hashean los bytes y no un JSON canónico porque
+hashlib suelta el GIL en buffers grandes y json.dumps no: canonizar un grafo
+de 200k nodos bloqueaba el event loop varios segundos.
+Dos niveles, los dos con el mismo TTL:
+ - LRU en memoria.
+ - Árbol B persistente (archivo propio, separado del de rutas planificadas),
+   acotado a max_disco entradas: al pasarse se descartan las vencidas y las
+   guardadas hace más tiempo. El archivo se reescribe como mucho una vez cada
+   intervalo_guardado segundos y fuera del lock, así las lecturas no esperan
+   el volcado.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from btree_storage import BTreeStore
+
+
+# Cambiar si cambia el algoritmo de calcular_camino_optimo: invalida todo lo guardado
+VERSION_ALGORITMO = "widest+shortest/v1"
+
+
+def digest_cuerpo(cuerpo: bytes) -> str:
+    return hashlib.sha256(cuerpo).hexdigest()
+
+
+# JSON canónico: el mismo grafo da el mismo digest sin importar el orden de
+# las claves. Es caro y retiene el GIL, por eso solo se usa en los procesos del pool.
+def digest_grafo(grafo_json: Dict[str, Any]) -> str:
+    canonico = json.dumps(grafo_json, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def clave_cache(digest: str, origen: str, destino: str, opciones: Optional[Dict[str, Any]] = None) -> str:
+    opts = dict(opciones or {})
+    opts.setdefault("algoritmo", VERSION_ALGORITMO)
+    opts_txt = json.dumps(opts, sort_keys=True, separators=(",", ":"))
+    return f"{digest}|{origen}->{destino}|{opts_txt}"
+
+
+class CacheRutas:
+    def __init__(self, capacidad: int = 256, ttl_segundos: float = 600.0,
+                 store_path: str = "cache_rutas.json", t: int = 2,
+                 max_disco: int = 2000, intervalo_guardado: float = 5.0):
+        self.capacidad = capacidad
+        self.ttl = ttl_segundos
+        self.store_path = store_path
+        self.t = t
+        self.max_disco = max_disco
+        self.intervalo_guardado = intervalo_guardado
+        self._memoria: "OrderedDict[str, tuple]" = OrderedDict()  # clave -> (expira, resultado)
+        self._bt: Optional[BTreeStore] = None
+        self._entradas_disco = 0
+        self._pendiente_guardar = False
+        self._ultimo_guardado = time.monotonic()
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+        self.podados = 0
+
+    def _store(self) -> BTreeStore:
+        # Se carga una sola vez; las escrituras posteriores pasan por persistir()
+        if self._bt is None:
+            self._bt = BTreeStore.load_or_create(self.store_path, t=self.t)
+            self._entradas_disco = sum(1 for _ in self._bt.items())
+        return self._bt
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        digest = clave.split("|", 1)[0]
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira, resultado = entrada
+                if expira >= time.monotonic():
+                    self._memoria.move_to_end(clave)
+                    self.hits_memoria += 1
+                    return resultado
+                del self._memoria[clave]
+
+            guardado = self._store().search(clave)
+            # Doble verificación: el digest guardado debe coincidir con el del grafo pedido
+            if guardado is not None and guardado.get("grafo_digest") == digest:
+                restante = guardado.get("guardado", 0) + self.ttl - time.time()
+                if restante > 0:
+                    resultado = guardado["resultado"]
+                    # En memoria vence cuando vence en disco, no un TTL completo después
+                    self._poner(clave, resultado, restante)
+                    self.hits_disco += 1
+                    return resultado
+                self.expirados += 1
+            elif entrada is not None:
+                self.expirados += 1
+
+            self.misses += 1
+            return None
+
+    def guardar(self, clave: str, resultado: Dict[str, Any]) -> None:
+        """Solo memoria; la escritura en disco la hace persistir() desde el hilo escritor."""
+        with self._lock:
+            self._poner(clave, resultado, self.ttl)
+
+    def persistir(self, clave: str, resultado: Dict[str, Any]) -> None:
+        """
+        Llamar solo desde el hilo escritor: es el único que modifica el árbol,
+        por eso el volcado puede hacerse sin el lock.
+        """
+        valor = {
+            "grafo_digest": clave.split("|", 1)[0],
+            "guardado": time.time(),
+            "resultado": resultado,
+        }
+        with self._lock:
+            if self._store().insert(clave, valor, guardar=False):
+                self._entradas_disco += 1
+            if self._entradas_disco > self.max_disco:
+                self._podar()
+            self._pendiente_guardar = True
+        if time.monotonic() - self._ultimo_guardado >= self.intervalo_guardado:
+            self.volcar()
+
+    def volcar(self) -> None:
+        """Escribe el archivo si hay cambios sin guardar (también al apagar la API)."""
+        with self._lock:
+            if not self._pendiente_guardar:
+                return
+            bt = self._store()
+            self._pendiente_guardar = False
+        self._ultimo_guardado = time.monotonic()
+        bt.save()
+
+    def _podar(self) -> None:
+        # Se reconstruye el árbol con las entradas vigentes más recientes. Se
+        # deja un 10% libre para no reconstruir en cada inserción.
+        limite = time.time() - self.ttl
+        vigentes = [(k, v) for k, v in self._bt.items() if v.get("guardado", 0) > limite]
+        vigentes.sort(key=lambda kv: kv[1]["guardado"], reverse=True)
+        conservar = vigentes[:int(self.max_disco * 0.9)]
+        nuevo = BTreeStore(t=self.t, file_path=self.store_path)
+        for k, v in sorted(conservar, key=lambda kv: kv[0]):
+            nuevo.insert(k, v, guardar=False)
+        self.podados += self._entradas_disco - len(conservar)
+        self._bt = nuevo
+        self._entradas_disco = len(conservar)
+
+    def _poner(self, clave: str, resultado: Dict[str, Any], ttl: float) -> None:
+        self._memoria[clave] = (time.monotonic() + ttl, resultado)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+            self.evictions += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entradas_memoria": len(self._memoria),
+                "capacidad": self.capacidad,
+                "ttl_segundos": self.ttl,
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirados": self.expirados,
+                "entradas_disco": self._entradas_disco,
+                "max_disco": self.max_disco,
+                "podados": self.podados,
+            }
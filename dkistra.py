@@ -1,8 +1,14 @@
+from __future__ import annotations
 import math
 import heapq
-from typing import List, Dict, Any, Tuple, Optional
-import networkx as nx
-from btree_storage import guardar_subgrafo
+import time
+from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
+from planificacion import guardar_ruta, guardar_rutas
+
+# networkx tarda en importarse y solo se usa al calcular rutas (en los
+# procesos del pool), no al arrancar la API
+if TYPE_CHECKING:
+    import networkx as nx
 
 
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -15,6 +21,7 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * R * math.asin(math.sqrt(a))
 
 def build_nx_from_grafo(grafo) -> nx.DiGraph:
+    import networkx as nx
 
     G = nx.DiGraph()
 
@@ -32,40 +39,47 @@ def build_nx_from_grafo(grafo) -> nx.DiGraph:
             to = e.get('to')
             if to is None:
                 continue
-            # capacity
-            cap = e.get('peso', e.get('weight', e.get('capacity', 1.0)))
-            try:
-                cap = float(cap)
-            except:
-                cap = 1.0
-            # length
-            length = None
-            if 'length' in e:
-                try:
-                    length = float(e['length'])
-                except:
-                    length = None
-            if length is None and 'dist' in e:
-                try:
-                    length = float(e['dist'])
-                except:
-                    length = None
-            if length is None:
-                # intentar calcular por lat/lng de nodos
-                src = grafo.nodos.get(origen, {})
-                dst = grafo.nodos.get(to, {})
-                if 'lat' in src and 'lng' in src and 'lat' in dst and 'lng' in dst:
-                    try:
-                        length = haversine(float(src['lat']), float(src['lng']),
-                                           float(dst['lat']), float(dst['lng']))
-                    except:
-                        length = 1.0
-                else:
-                    length = 1.0
+            cap, length = atributos_arista(grafo, origen, e)
             G.add_edge(origen, to, capacity=cap, length=length, raw=e)
     return G
 
-def widest_path(G: nx.DiGraph, source: str, target: str, capacity_attr: str = 'capacity') -> Tuple[float, List[str]]:
+def atributos_arista(grafo, origen: str, e: Dict[str, Any]) -> Tuple[float, float]:
+    """(capacidad, longitud en metros) de una arista de Grafo, con los mismos valores por defecto que build_nx_from_grafo."""
+    to = e.get('to')
+    # capacity
+    cap = e.get('peso', e.get('weight', e.get('capacity', 1.0)))
+    try:
+        cap = float(cap)
+    except:
+        cap = 1.0
+    # length
+    length = None
+    if 'length' in e:
+        try:
+            length = float(e['length'])
+        except:
+            length = None
+    if length is None and 'dist' in e:
+        try:
+            length = float(e['dist'])
+        except:
+            length = None
+    if length is None:
+        # intentar calcular por lat/lng de nodos
+        src = grafo.nodos.get(origen, {})
+        dst = grafo.nodos.get(to, {})
+        if 'lat' in src and 'lng' in src and 'lat' in dst and 'lng' in dst:
+            try:
+                length = haversine(float(src['lat']), float(src['lng']),
+                                   float(dst['lat']), float(dst['lng']))
+            except:
+                length = 1.0
+        else:
+            length = 1.0
+    return cap, length
+
+def widest_path(G: nx.DiGraph, source: str, target: str, capacity_attr: str = 'capacity',
+                stats: Optional[Dict[str, int]] = None) -> Tuple[float, List[str]]:
 
     if source not in G or target not in G:
         return 0.0, []
@@ -73,11 +87,13 @@ def widest_path(G: nx.DiGraph, source: str, target: str, capacity_attr: str = 'c
     prev: Dict[str, str] = {}
     best[source] = float('inf')
     heap = [(-best[source], source)]
+    asentados = 0
     while heap:
         negb, u = heapq.heappop(heap)
         b = -negb
         if b < best[u]:
             continue
+        asentados += 1
         if u == target:
             break
         for v in G.successors(u):
@@ -87,6 +103,8 @@ def widest_path(G: nx.DiGraph, source: str, target: str, capacity_attr: str = 'c
                 best[v] = bott
                 prev[v] = u
                 heapq.heappush(heap, (-bott, v))
+    if stats is not None:
+        stats['nodos_asentados'] = asentados
     if best[target] == 0.0:
         return 0.0, []
 
@@ -103,6 +121,7 @@ def widest_path(G: nx.DiGraph, source: str, target: str, capacity_attr: str = 'c
 
 def shortest_path_with_capacity_threshold(G: nx.DiGraph, source: str, target: str, min_capacity: float,
                                           capacity_attr: str = 'capacity', length_attr: str = 'length') -> Tuple[Optional[float], Optional[List[str]]]:
+    import networkx as nx
 
     H = nx.DiGraph()
     for u, v, d in G.edges(data=True):
@@ -133,24 +152,34 @@ def export_path_subgraph(G: nx.DiGraph, path: List[str]) -> Dict[str, Any]:
         edges.append(edge_out)
     return {"nodes": nodes, "edges": edges}
 
-def calcular_camino_optimo(grafo, origen: str, destino: str) -> Dict[str, Any]:
-
+def calcular_camino_optimo(grafo, origen: str, destino: str, guardar: bool = True,
+                           medicion: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Si se pasa `medicion`, se llena con la duración de cada etapa
+    (medicion['etapas'], en segundos) y los nodos asentados por widest_path.
+    """
+    if medicion is None:
+        medicion = {}
+    etapas = medicion.setdefault('etapas', {})
 
     if origen not in grafo.nodos or destino not in grafo.nodos:
         return {"ok": False, "error": "Origen o destino no existen en el grafo."}
 
-
+    inicio = time.perf_counter()
     Gnx = build_nx_from_grafo(grafo)
+    etapas['build_nx_from_grafo'] = time.perf_counter() - inicio
 
-
-    bottleneck, path_widest = widest_path(Gnx, origen, destino)
+    inicio = time.perf_counter()
+    bottleneck, path_widest = widest_path(Gnx, origen, destino, stats=medicion)
+    etapas['widest_path'] = time.perf_counter() - inicio
     if bottleneck == 0.0 or not path_widest:
         return {"ok": False, "error": "No existe camino entre origen y destino."}
 
-
+    inicio = time.perf_counter()
     length, path_short = shortest_path_with_capacity_threshold(
         Gnx, origen, destino, bottleneck
     )
+    etapas['shortest_path_with_capacity_threshold'] = time.perf_counter() - inicio
 
     if path_short is None:
         path_short = path_widest
@@ -171,9 +200,24 @@ def calcular_camino_optimo(grafo, origen: str, destino: str) -> Dict[str, Any]:
     }
 
 
+    # Con guardar=False la persistencia queda a cargo del llamador (ver ejecucion.py)
+    if guardar:
+        persistir_resultado(origen, destino, resultado)
+
+    return resultado
+
+
+def persistir_resultado(origen: str, destino: str, resultado: Dict[str, Any],
+                        store_path: str = "btree_store.json") -> None:
     clave = f"{origen}->{destino}"
-    guardar_subgrafo(clave, resultado, store_path="btree_store.json", t=2)
+    guardar_ruta(clave, resultado, store_path=store_path, t=2)
 
     print(f"[B-TREE] Subgrafo para {clave} guardado exitosamente.")
 
-    return resultado
+
+def persistir_resultados(lote: List[Tuple[str, str, Dict[str, Any]]],
+                         store_path: str = "btree_store.json") -> None:
+    """Como persistir_resultado, pero con una sola escritura del Árbol B para todo el lote."""
+    guardar_rutas([(f"{o}->{d}", r) for o, d, r in lote], store_path=store_path, t=2)
+
+    print(f"[B-TREE] {len(lote)} subgrafos guardados exitosamente.")
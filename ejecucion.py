@@ -0,0 +1,258 @@
+"""
+Capa de ejecución para las rutas pesadas de la API.
+
+- La búsqueda (construcción del grafo + widest/shortest path) corre en un
+  pool de procesos acotado, fuera del threadpool compartido de FastAPI.
+- La persistencia en el Árbol B se hace en un único hilo escritor que
+  consume una cola, así el request no espera el volcado del archivo JSON.
+  Las rutas se agrupan en lotes: el archivo se reescribe una vez por lote,
+  no una vez por ruta.
+- Control de admisión: si hay demasiadas búsquedas en curso se responde 429,
+  y cada búsqueda tiene un tiempo máximo.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# ------------ Config ------------
+MAX_PROCESOS = int(os.environ.get("RUTAS_MAX_PROCESOS", max(1, (os.cpu_count() or 2) - 1)))
+MAX_EN_COLA = int(os.environ.get("RUTAS_MAX_EN_COLA", 16))
+TIMEOUT_SEGUNDOS = float(os.environ.get("RUTAS_TIMEOUT_SEGUNDOS", 30))
+MAX_ESCRITURAS_PENDIENTES = int(os.environ.get("RUTAS_MAX_ESCRITURAS_PENDIENTES", 1000))
+# Las rutas que llegan dentro de esta ventana se guardan con una sola escritura del Árbol B
+INTERVALO_ESCRITURA = float(os.environ.get("RUTAS_INTERVALO_ESCRITURA", 2.0))
+# ---------------------------------
+
+
+class Saturado(Exception):
+    """No hay cupo para admitir otra búsqueda (se traduce a HTTP 429)."""
+
+
+class TiempoAgotado(Exception):
+    """La búsqueda superó TIMEOUT_SEGUNDOS (se traduce a HTTP 504)."""
+
+
+class PoolCaido(Exception):
+    """Un proceso del pool murió (OOM, segfault); el pool se recrea (se traduce a HTTP 503)."""
+
+
+# Se ejecuta dentro de los procesos del pool: debe ser una función de módulo
+# (serializable) y no debe escribir en disco. Las métricas del proceso hijo no
+# llegan al registro del padre, por eso se devuelven junto al resultado.
+def buscar_camino(grafo_json: Dict[str, Any], origen: str, destino: str,
+                  perfil: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    from Grafo_Respose import Grafo
+    from cache_rutas import digest_grafo
+    from dkistra import calcular_camino_optimo
+
+    medicion: Dict[str, Any] = {"etapas": {}}
+    profiler = None
+    if perfil:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    inicio = time.perf_counter()
+    g = Grafo()
+    g.cargar_desde_json(grafo_json)
+    medicion["etapas"]["cargar_desde_json"] = time.perf_counter() - inicio
+    medicion.update(g.info())
+
+    resultado = calcular_camino_optimo(g, origen, destino, guardar=False, medicion=medicion)
+
+    # Digest canónico del grafo, guardado con la ruta: acá no frena al event loop
+    inicio = time.perf_counter()
+    medicion["grafo_digest"] = digest_grafo(grafo_json)
+    medicion["etapas"]["digest_grafo"] = time.perf_counter() - inicio
+
+    if profiler is not None:
+        import io
+        import pstats
+        profiler.disable()
+        salida = io.StringIO()
+        pstats.Stats(profiler, stream=salida).sort_stats("cumulative").print_stats(30)
+        medicion["perfil"] = salida.getvalue()
+    return resultado, medicion
+
+
+def asignar_en_lote(grafo_json: Dict[str, Any], store_path: str, demandas: Optional[Dict[str, float]],
+                    max_iteraciones: int, tiempo_limite: float) -> Dict[str, Any]:
+    from Grafo_Respose import Grafo
+    from asignacion import asignar_capacidad, pares_desde_store
+    from cache_rutas import digest_grafo
+
+    # Leer el Árbol B y canonizar el grafo retienen el GIL: se hace acá y no en la API
+    pares, otro_grafo = pares_desde_store(digest_grafo(grafo_json), store_path, demandas)
+    g = Grafo()
+    g.cargar_desde_json(grafo_json)
+    resultado = asignar_capacidad(g, pares, max_iteraciones=max_iteraciones, tiempo_limite=tiempo_limite)
+    # Las rutas calculadas sobre otro grafo también cuentan como omitidas
+    resultado["od_omitidos"] = otro_grafo + resultado.get("od_omitidos", [])
+    return resultado
+
+
+def precargar() -> None:
+    """Inicializador de los procesos del pool: importa lo pesado antes del primer request."""
+    import networkx  # noqa: F401
+    import dkistra  # noqa: F401
+    import Grafo_Respose  # noqa: F401
+
+
+class EjecutorRutas:
+    def __init__(self, max_procesos: int = MAX_PROCESOS, max_en_cola: int = MAX_EN_COLA,
+                 timeout: float = TIMEOUT_SEGUNDOS):
+        self.max_procesos = max_procesos
+        # Búsquedas admitidas = las que corren + las que esperan un proceso libre
+        self.max_admitidas = max_procesos + max_en_cola
+        self.timeout = timeout
+        self.en_curso = 0
+        self.rechazadas = 0
+        self.reinicios = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def iniciar(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_procesos, initializer=precargar)
+            # Levanta los procesos ya, sin esperar, para que el primer request no pague el arranque
+            for _ in range(self.max_procesos):
+                self._pool.submit(time.sleep, 0)
+
+    def detener(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def ejecutar(self, fn: Callable, *args) -> Any:
+        """
+        Envía fn(*args) al pool de procesos.
+        Lanza Saturado si no hay cupo, TiempoAgotado si no termina a tiempo y
+        PoolCaido si murió un proceso del pool.
+        """
+        if self._pool is None:
+            self.iniciar()
+        # Solo se modifica desde el event loop, no necesita lock
+        if self.en_curso >= self.max_admitidas:
+            self.rechazadas += 1
+            raise Saturado()
+
+        pool = self._pool
+        loop = asyncio.get_running_loop()
+        try:
+            futuro = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reiniciar(pool)
+            raise PoolCaido()
+        # El cupo se toma recién con el trabajo enviado y se libera cuando el
+        # proceso realmente termina, no cuando se agota el timeout: un proceso
+        # no se puede interrumpir a mitad de camino.
+        self.en_curso += 1
+        futuro.add_done_callback(lambda _f: loop.call_soon_threadsafe(self._liberar))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            futuro.cancel()
+            raise TiempoAgotado()
+        except BrokenProcessPool:
+            self._reiniciar(pool)
+            raise PoolCaido()
+
+    def _reiniciar(self, roto: ProcessPoolExecutor) -> None:
+        # Un ProcessPoolExecutor roto no se recupera. Varios requests pueden
+        # verlo caer a la vez: solo el primero lo reemplaza.
+        if self._pool is not roto:
+            return
+        roto.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self.reinicios += 1
+        print("[EJECUTOR] Un proceso del pool murió; se recrea el pool.")
+        self.iniciar()
+
+    def _liberar(self) -> None:
+        self.en_curso -= 1
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "procesos": self.max_procesos,
+            "en_curso": self.en_curso,
+            "max_admitidas": self.max_admitidas,
+            "rechazadas": self.rechazadas,
+            "reinicios": self.reinicios,
+        }
+
+
+class EscritorSubgrafos:
+    """
+    Hilo único que persiste resultados en el Árbol B.
+    Un solo escritor evita que dos requests reescriban el archivo a la vez.
+    persistir recibe el lote: una lista con los argumentos de cada encolar().
+    """
+
+    def __init__(self, persistir: Callable[[List[Tuple]], None], max_pendientes: int = MAX_ESCRITURAS_PENDIENTES,
+                 intervalo: float = INTERVALO_ESCRITURA):
+        self._persistir = persistir
+        self.intervalo = intervalo
+        self._cola: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=max_pendientes)
+        self._hilo: Optional[threading.Thread] = None
+        self.escritos = 0
+        self.errores = 0
+        self.descartados = 0
+
+    def iniciar(self) -> None:
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="escritor-btree", daemon=True)
+            self._hilo.start()
+
+    def detener(self) -> None:
+        # Vacía lo pendiente antes de terminar
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join()
+            self._hilo = None
+
+    def encolar(self, *args) -> bool:
+        """
+        Si la cola de escritura está llena la escritura se descarta y devuelve
+        False: el resultado ya se calculó y no debe perderse la respuesta por eso.
+        """
+        try:
+            self._cola.put_nowait(args)
+            return True
+        except queue.Full:
+            self.descartados += 1
+            return False
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def _bucle(self) -> None:
+        terminar = False
+        while not terminar:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                return
+            lote = [trabajo]
+            # Junta lo que llegue durante la ventana; al apagar se guarda lo juntado y se sale
+            limite = time.monotonic() + self.intervalo
+            while True:
+                restante = limite - time.monotonic()
+                try:
+                    trabajo = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if trabajo is None:
+                    terminar = True
+                    break
+                lote.append(trabajo)
+            try:
+                self._persistir(lote)
+                self.escritos += len(lote)
+            except Exception as e:
+                self.errores += len(lote)
+                print(f"[B-TREE] Error guardando {len(lote)} subgrafos: {e}")
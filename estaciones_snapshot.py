@@ -0,0 +1,139 @@
+"""
+Snapshot binario de estaciones.geojson para arrancar la API sin parsear JSON.
+
+compilar() convierte el GeoJSON (3 MB) a un archivo binario que luego se
+abre con mmap: solo se leen las páginas que se consultan.
+
+Formato (little-endian):
+    cabecera  8s magic | I n | I bytes del bloque de textos
+    lon       n x float64
+    lat       n x float64
+    offsets   (3n + 1) x uint32    inicio de id, nombre y tipo de cada estación
+    textos    utf-8 concatenado
+Las estaciones van ordenadas por id para buscarlas por bisección.
+
+Uso (paso de build, también se hace solo si el snapshot falta o está viejo):
+    python estaciones_snapshot.py estaciones.geojson estaciones.bin
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, Optional
+
+MAGIC = b"ESTAv1\0\0"
+CABECERA = struct.Struct("<8sII")
+
+
+def compilar(geojson_path: str = "estaciones.geojson", bin_path: str = "estaciones.bin") -> int:
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        features = json.load(f)["features"]
+
+    estaciones = []
+    for feat in features:
+        props = feat.get("properties", {})
+        lon, lat = feat["geometry"]["coordinates"][:2]
+        # estaciones.geojson del repo usa id/nombre; el que genera ETF.py usa stop_id/stop_name
+        sid = str(props.get("id", props.get("stop_id", "")))
+        nombre = str(props.get("nombre", props.get("stop_name", "")) or "")
+        tipo = str(props.get("tipo", "") or "")
+        estaciones.append((sid, nombre, tipo, float(lon), float(lat)))
+    estaciones.sort(key=lambda e: e[0])
+
+    n = len(estaciones)
+    textos = bytearray()
+    offsets = []
+    for sid, nombre, tipo, _, _ in estaciones:
+        for txt in (sid, nombre, tipo):
+            offsets.append(len(textos))
+            textos += txt.encode("utf-8")
+    offsets.append(len(textos))
+
+    # Temporal único por escritor: varios workers de uvicorn pueden compilar a la vez
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(bin_path)),
+                                    prefix=f"{os.path.basename(bin_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(CABECERA.pack(MAGIC, n, len(textos)))
+            f.write(struct.pack(f"<{n}d", *(e[3] for e in estaciones)))
+            f.write(struct.pack(f"<{n}d", *(e[4] for e in estaciones)))
+            f.write(struct.pack(f"<{3 * n + 1}I", *offsets))
+            f.write(textos)
+        os.replace(tmp_path, bin_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return n
+
+
+class Estaciones:
+    """Vista de solo lectura sobre el snapshot mapeado en memoria."""
+
+    def __init__(self, bin_path: str = "estaciones.bin"):
+        self.bin_path = bin_path
+        with open(bin_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, _ = CABECERA.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{bin_path} no es un snapshot de estaciones")
+        self.n = n
+        vista = memoryview(self._mm)
+        pos = CABECERA.size
+        self._lon = vista[pos:pos + 8 * n].cast("d")
+        pos += 8 * n
+        self._lat = vista[pos:pos + 8 * n].cast("d")
+        pos += 8 * n
+        self._offsets = vista[pos:pos + 4 * (3 * n + 1)].cast("I")
+        pos += 4 * (3 * n + 1)
+        self._textos = vista[pos:]
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _texto(self, j: int) -> str:
+        return bytes(self._textos[self._offsets[j]:self._offsets[j + 1]]).decode("utf-8")
+
+    def id(self, i: int) -> str:
+        return self._texto(3 * i)
+
+    def estacion(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": self._texto(3 * i),
+            "nombre": self._texto(3 * i + 1),
+            "tipo": self._texto(3 * i + 2),
+            "lat": self._lat[i],
+            "lng": self._lon[i],
+        }
+
+    def buscar(self, sid: str) -> Optional[Dict[str, Any]]:
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.id(mid) < sid:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and self.id(lo) == sid:
+            return self.estacion(lo)
+        return None
+
+
+def cargar_estaciones(geojson_path: str = "estaciones.geojson",
+                      bin_path: str = "estaciones.bin") -> Estaciones:
+    """Abre el snapshot; si falta o es más viejo que el GeoJSON, lo compila antes."""
+    try:
+        viejo = os.path.getmtime(bin_path) < os.path.getmtime(geojson_path)
+    except FileNotFoundError:
+        viejo = not os.path.exists(bin_path)
+    if viejo:
+        compilar(geojson_path, bin_path)
+    return Estaciones(bin_path)
+
+
+if __name__ == '__main__':
+    origen = sys.argv[1] if len(sys.argv) > 1 else "estaciones.geojson"
+    destino = sys.argv[2] if len(sys.argv) > 2 else "estaciones.bin"
+    print(f"Guardado: {destino} ({compilar(origen, destino)} estaciones)")
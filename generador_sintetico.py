@@ -0,0 +1,228 @@
+"""
+Generador determinístico de datos sintéticos a escala de ciudad.
+
+ - GTFS (routes, shapes, trips, stop_times, stops) listo para ETF.main.
+ - Payloads de Grafo con el mismo formato que arma main.html
+   ({"nodos": {...}, "aristas": {...}}) para /camino_optimo.
+
+Los paraderos se ubican en una grilla sobre el área de Bogotá y las rutas son
+recorridos aleatorios sobre esa grilla. La misma semilla produce siempre los
+mismos archivos.
+
+Uso:
+    python generador_sintetico.py gtfs salida_gtfs/ --paradas 10000
+    python generador_sintetico.py grafo grafo.json --nodos 10000
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Caja aproximada de Bogotá
+LAT_MIN, LAT_MAX = 4.47, 4.83
+LON_MIN, LON_MAX = -74.22, -74.01
+
+TIPOS_RUTA = ["TRONCAL", "ALIMENTADOR", "URBANO"]
+TIPOS_NODO = ["TRONCAL", "ALIMENTADOR", "URBANO"]
+
+
+def _grilla(n: int):
+    """Devuelve (lado, coord(i)) para ubicar n puntos en una grilla regular."""
+    lado = max(2, math.ceil(math.sqrt(n)))
+
+    def coord(i: int):
+        fila, col = divmod(i, lado)
+        lat = LAT_MIN + (LAT_MAX - LAT_MIN) * fila / (lado - 1)
+        lon = LON_MIN + (LON_MAX - LON_MIN) * col / (lado - 1)
+        return round(lat, 6), round(lon, 6)
+
+    return lado, coord
+
+
+def _recorrido(rnd: random.Random, n: int, lado: int, largo: int) -> List[int]:
+    """Recorrido aleatorio sin repetir paraderos consecutivos sobre la grilla."""
+    actual = rnd.randrange(n)
+    camino = [actual]
+    while len(camino) < largo:
+        fila, col = divmod(actual, lado)
+        opciones = []
+        for df, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            f, c = fila + df, col + dc
+            if 0 <= f < lado and 0 <= c < lado and f * lado + c < n:
+                opciones.append(f * lado + c)
+        if not opciones:
+            break
+        actual = rnd.choice(opciones)
+        camino.append(actual)
+    return camino
+
+
+def _hhmmss(segundos: int) -> str:
+    # GTFS permite horas >= 24 para viajes que pasan la medianoche
+    h, resto = divmod(segundos, 3600)
+    m, s = divmod(resto, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def generar_gtfs(out_dir, n_paradas: int = 10_000, n_rutas: int = None, paradas_por_ruta: int = 30,
+                 viajes_por_ruta: int = 4, semilla: int = 0, puntos_por_tramo: int = 1) -> Dict[str, int]:
+    """
+    Escribe un feed GTFS sintético en out_dir y devuelve el número de filas por archivo.
+    stop_times tiene n_rutas * viajes_por_ruta * paradas_por_ruta filas.
+    Con puntos_por_tramo > 1 la forma lleva puntos intermedios con ruido de
+    ~2 m, como un trazado GPS real.
+    """
+    rnd = random.Random(semilla)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if n_rutas is None:
+        n_rutas = max(1, n_paradas // 10)
+    lado, coord = _grilla(n_paradas)
+    filas = {}
+
+    with open(out_dir / "stops.txt", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type"])
+        for i in range(n_paradas):
+            lat, lon = coord(i)
+            w.writerow([f"S{i}", f"Paradero {i}", lat, lon, 0])
+    filas["stops.txt"] = n_paradas
+
+    recorridos = [_recorrido(rnd, n_paradas, lado, paradas_por_ruta) for _ in range(n_rutas)]
+
+    with open(out_dir / "routes.txt", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["route_id", "route_short_name", "route_long_name", "route_desc", "route_type"])
+        for r in range(n_rutas):
+            w.writerow([f"R{r}", f"{r % 100}-{r // 100}", f"Ruta sintética {r}",
+                        TIPOS_RUTA[r % len(TIPOS_RUTA)], 3])
+    filas["routes.txt"] = n_rutas
+
+    # La forma pasa por cada paradero y por puntos intermedios de cada tramo
+    n_shapes = 0
+    with open(out_dir / "shapes.txt", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"])
+        for r, camino in enumerate(recorridos):
+            seq = 0
+            for a, b in zip(camino, camino[1:] + [None]):
+                lat, lon = coord(a)
+                w.writerow([f"SH{r}", lat, lon, seq])
+                seq += 1
+                if b is not None:
+                    lat2, lon2 = coord(b)
+                    for k in range(1, puntos_por_tramo + 1):
+                        frac = k / (puntos_por_tramo + 1)
+                        dlat = dlon = 0.0
+                        if puntos_por_tramo > 1:
+                            dlat, dlon = rnd.uniform(-2e-5, 2e-5), rnd.uniform(-2e-5, 2e-5)
+                        w.writerow([f"SH{r}", round(lat + (lat2 - lat) * frac + dlat, 6),
+                                    round(lon + (lon2 - lon) * frac + dlon, 6), seq])
+                        seq += 1
+            n_shapes += seq
+    filas["shapes.txt"] = n_shapes
+
+    n_stop_times = 0
+    with open(out_dir / "trips.txt", "w", newline="", encoding="utf-8") as ft, \
+            open(out_dir / "stop_times.txt", "w", newline="", encoding="utf-8") as fst:
+        wt = csv.writer(ft)
+        wst = csv.writer(fst)
+        wt.writerow(["route_id", "service_id", "trip_id", "shape_id"])
+        wst.writerow(["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"])
+        for r, camino in enumerate(recorridos):
+            # Primer viaje entre las 5:00 y las 6:00, luego cada 15-30 minutos
+            salida = 5 * 3600 + rnd.randrange(3600)
+            for v in range(viajes_por_ruta):
+                trip_id = f"T{r}_{v}"
+                wt.writerow([f"R{r}", "LV", trip_id, f"SH{r}"])
+                t = salida
+                for seq, parada in enumerate(camino):
+                    llegada = t
+                    t += rnd.randrange(15, 45)  # tiempo detenido
+                    wst.writerow([trip_id, _hhmmss(llegada), _hhmmss(t), f"S{parada}", seq + 1])
+                    t += rnd.randrange(60, 180)  # viaje al siguiente paradero
+                    n_stop_times += 1
+                salida += rnd.randrange(900, 1800)
+    filas["trips.txt"] = n_rutas * viajes_por_ruta
+    filas["stop_times.txt"] = n_stop_times
+    return filas
+
+
+def generar_grafo(n_nodos: int = 10_000, semilla: int = 0, prob_diagonal: float = 0.1) -> Dict[str, Any]:
+    """
+    Grafo dirigido en grilla con aristas en ambos sentidos (y algunas
+    diagonales), en el formato que recibe Grafo.cargar_desde_json.
+    Tiene aproximadamente 4 * n_nodos aristas.
+    """
+    rnd = random.Random(semilla)
+    lado, coord = _grilla(n_nodos)
+    nodos = {}
+    aristas = {}
+    for i in range(n_nodos):
+        lat, lon = coord(i)
+        nodos[f"N{i}"] = {
+            "lat": lat,
+            "lng": lon,
+            "tipo": TIPOS_NODO[rnd.randrange(len(TIPOS_NODO))],
+            "capacidad": rnd.randrange(50, 500),
+        }
+        aristas[f"N{i}"] = []
+
+    def conectar(a: int, b: int):
+        peso = rnd.randrange(10, 200)
+        for u, v in ((a, b), (b, a)):
+            aristas[f"N{u}"].append({
+                "to": f"N{v}",
+                "peso": peso,
+                "coordinates": [list(coord(u)), list(coord(v))],
+            })
+
+    for i in range(n_nodos):
+        fila, col = divmod(i, lado)
+        if col + 1 < lado and i + 1 < n_nodos:
+            conectar(i, i + 1)
+        if i + lado < n_nodos:
+            conectar(i, i + lado)
+            if col + 1 < lado and i + lado + 1 < n_nodos and rnd.random() < prob_diagonal:
+                conectar(i, i + lado + 1)
+
+    return {"nodos": nodos, "aristas": aristas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="tipo", required=True)
+
+    p_gtfs = sub.add_parser("gtfs", help="feed GTFS sintético")
+    p_gtfs.add_argument("salida")
+    p_gtfs.add_argument("--paradas", type=int, default=10_000)
+    p_gtfs.add_argument("--rutas", type=int, default=None)
+    p_gtfs.add_argument("--paradas-por-ruta", type=int, default=30)
+    p_gtfs.add_argument("--viajes-por-ruta", type=int, default=4)
+    p_gtfs.add_argument("--semilla", type=int, default=0)
+    p_gtfs.add_argument("--puntos-por-tramo", type=int, default=1)
+
+    p_grafo = sub.add_parser("grafo", help="payload de Grafo en JSON")
+    p_grafo.add_argument("salida")
+    p_grafo.add_argument("--nodos", type=int, default=10_000)
+    p_grafo.add_argument("--semilla", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.tipo == "gtfs":
+        filas = generar_gtfs(args.salida, args.paradas, args.rutas, args.paradas_por_ruta,
+                             args.viajes_por_ruta, args.semilla, args.puntos_por_tramo)
+        for archivo, n in filas.items():
+            print(f"{archivo}: {n} filas")
+    else:
+        grafo = generar_grafo(args.nodos, args.semilla)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(grafo, f, ensure_ascii=False)
+        print(f"Guardado: {args.salida} ({len(grafo['nodos'])} nodos)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Horarios compactos y consultas de llegada más temprana (Connection Scan).
+
+ETF.py arma los horarios desde stop_times.txt y trips.txt: cada par de
+paradas consecutivas de un viaje es una conexión (desde, hasta, salida,
+llegada, viaje). Las conexiones se guardan ordenadas por hora de salida en
+arreglos de enteros de 32 bits (módulo array), así la consulta no necesita
+numpy ni pandas.
+
+Formato de horarios.bin (little-endian):
+    8s magic | I largo del JSON | JSON utf-8 {paradas, viajes, rutas}
+    I m | 5 arreglos int32 de largo m: salida, llegada, desde, hasta, viaje
+
+Limitaciones: sin transbordos a pie entre paraderos distintos ni tiempo
+mínimo de transbordo; todos los viajes se asumen activos (sin calendario).
+"""
+
+import json
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Union
+
+MAGIC = b"HORAv1\0\0"
+INF = 2 ** 31 - 1
+HORIZONTE_SEGUNDOS = 4 * 3600  # no se buscan viajes de más de 4 horas
+
+
+def a_segundos(hora: Union[str, int]) -> int:
+    if isinstance(hora, int):
+        return hora
+    h, m, s = (int(x) for x in str(hora).strip().split(":"))
+    return h * 3600 + m * 60 + s
+
+
+def a_hhmmss(segundos: int) -> str:
+    h, resto = divmod(int(segundos), 3600)
+    m, s = divmod(resto, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+class Horarios:
+    def __init__(self, paradas: List[str], viajes: List[str], rutas: List[str],
+                 salida: array, llegada: array, desde: array, hasta: array, viaje: array):
+        self.paradas = paradas
+        self.viajes = viajes
+        self.rutas = rutas  # ruta de cada viaje
+        self.salida = salida
+        self.llegada = llegada
+        self.desde = desde
+        self.hasta = hasta
+        self.viaje = viaje
+        self.indice_parada = {p: i for i, p in enumerate(paradas)}
+
+    def __len__(self) -> int:
+        return len(self.salida)
+
+    # ---------- Persistencia ----------
+    def guardar(self, path) -> None:
+        meta = json.dumps({"paradas": self.paradas, "viajes": self.viajes, "rutas": self.rutas},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(meta)))
+            f.write(meta)
+            f.write(struct.pack("<I", len(self.salida)))
+            for arr in (self.salida, self.llegada, self.desde, self.hasta, self.viaje):
+                if sys.byteorder != "little":
+                    arr = array("i", arr)
+                    arr.byteswap()
+                arr.tofile(f)
+
+    @classmethod
+    def cargar(cls, path) -> "Horarios":
+        with open(path, "rb") as f:
+            if f.read(8) != MAGIC:
+                raise ValueError(f"{path} no es un archivo de horarios")
+            (largo,) = struct.unpack("<I", f.read(4))
+            meta = json.loads(f.read(largo).decode("utf-8"))
+            (m,) = struct.unpack("<I", f.read(4))
+            arreglos = []
+            for _ in range(5):
+                arr = array("i")
+                arr.fromfile(f, m)
+                if sys.byteorder != "little":
+                    arr.byteswap()
+                arreglos.append(arr)
+        return cls(meta["paradas"], meta["viajes"], meta["rutas"], *arreglos)
+
+    # ---------- Consulta ----------
+    def llegada_mas_temprana(self, origen: str, destino: str, salida: Union[str, int],
+                             horizonte: int = HORIZONTE_SEGUNDOS) -> Dict[str, Any]:
+        """
+        Connection Scan: recorre las conexiones desde `salida` hasta que ya no
+        pueden mejorar el destino o se pasa el horizonte de búsqueda.
+        """
+        o = self.indice_parada.get(origen)
+        d = self.indice_parada.get(destino)
+        if o is None or d is None:
+            return {"ok": False, "error": "Origen o destino no existen en los horarios."}
+        t0 = a_segundos(salida)
+        if o == d:
+            # Sin este corte el objetivo nunca se fija y se recorre toda la ventana
+            return {"ok": True, "llegada": a_hhmmss(t0), "duracion_segundos": 0, "tramos": [],
+                    "conexiones_examinadas": 0}
+
+        c_salida, c_llegada = self.salida, self.llegada
+        c_desde, c_hasta, c_viaje = self.desde, self.hasta, self.viaje
+        mejor = [INF] * len(self.paradas)
+        mejor[o] = t0
+        en_viaje = bytearray(len(self.viajes))  # 1 si ya se puede ir en ese viaje
+        abordaje = {}   # viaje -> conexión donde se sube
+        por = {}        # parada -> conexión con la que se llega mejor
+        objetivo = INF  # = mejor[d], en una variable local por velocidad
+
+        inicio = bisect_left(c_salida, t0)
+        fin = bisect_left(c_salida, t0 + horizonte)
+        c = inicio
+        while c < fin:
+            sal = c_salida[c]
+            if sal >= objetivo:
+                break
+            v = c_viaje[c]
+            if en_viaje[v] or mejor[c_desde[c]] <= sal:
+                if not en_viaje[v]:
+                    en_viaje[v] = 1
+                    abordaje[v] = c
+                h = c_hasta[c]
+                lleg = c_llegada[c]
+                if lleg < mejor[h]:
+                    mejor[h] = lleg
+                    por[h] = c
+                    if h == d:
+                        objetivo = lleg
+            c += 1
+
+        examinadas = c - inicio
+        if mejor[d] == INF:
+            return {"ok": False, "error": "No hay forma de llegar al destino en las horas siguientes a la salida.",
+                    "conexiones_examinadas": examinadas}
+
+        tramos = []
+        parada = d
+        while parada != o:
+            c_fin = por[parada]
+            v = c_viaje[c_fin]
+            c_ini = abordaje[v]
+            tramos.append({
+                "viaje": self.viajes[v],
+                "ruta": self.rutas[v],
+                "desde": self.paradas[c_desde[c_ini]],
+                "hasta": self.paradas[parada],
+                "salida": a_hhmmss(c_salida[c_ini]),
+                "llegada": a_hhmmss(c_llegada[c_fin]),
+            })
+            parada = c_desde[c_ini]
+        tramos.reverse()
+
+        return {
+            "ok": True,
+            "llegada": a_hhmmss(mejor[d]),
+            "duracion_segundos": mejor[d] - t0,
+            "tramos": tramos,
+            "conexiones_examinadas": examinadas,
+        }
+
+
+def construir_horarios(stop_times, trips) -> Horarios:
+    """Arma los horarios a partir de los DataFrames de ETF.py (columnas GTFS como texto)."""
+    import numpy as np
+    import pandas as pd
+
+    st = stop_times[['trip_id', 'stop_id', 'stop_sequence', 'arrival_time', 'departure_time']].copy()
+    st['stop_sequence'] = pd.to_numeric(st['stop_sequence'], errors='coerce')
+    # Si falta una de las dos horas se usa la otra
+    st['arrival_time'] = st['arrival_time'].fillna(st['departure_time'])
+    st['departure_time'] = st['departure_time'].fillna(st['arrival_time'])
+    st = st.dropna()
+    for col in ('arrival_time', 'departure_time'):
+        hms = st[col].str.strip().str.split(':', expand=True).astype(np.int64)
+        st[col] = hms[0] * 3600 + hms[1] * 60 + hms[2]
+    st = st.sort_values(['trip_id', 'stop_sequence'], kind='mergesort')
+
+    paradas, stop_idx = np.unique(st['stop_id'].to_numpy(), return_inverse=True)
+    viajes, trip_idx = np.unique(st['trip_id'].to_numpy(), return_inverse=True)
+    sal = st['departure_time'].to_numpy()
+    lleg = st['arrival_time'].to_numpy()
+
+    # Conexión = fila i -> fila i+1 del mismo viaje
+    mismo = trip_idx[:-1] == trip_idx[1:]
+    c_salida = sal[:-1][mismo]
+    c_llegada = lleg[1:][mismo]
+    c_desde = stop_idx[:-1][mismo]
+    c_hasta = stop_idx[1:][mismo]
+    c_viaje = trip_idx[:-1][mismo]
+
+    orden = np.lexsort((c_llegada, c_salida))
+    trip_to_route = trips.set_index('trip_id')['route_id'].to_dict()
+
+    def a_array(x):
+        arr = array('i')
+        arr.frombytes(np.ascontiguousarray(x[orden], dtype='<i4').tobytes())
+        return arr
+
+    return Horarios(
+        [str(p) for p in paradas],
+        [str(v) for v in viajes],
+        [str(trip_to_route.get(v, '')) for v in viajes],
+        a_array(c_salida), a_array(c_llegada), a_array(c_desde), a_array(c_hasta), a_array(c_viaje),
+    )
+
+
+_cargados: Dict[str, Horarios] = {}
+
+
+def obtener_horarios(path: str = "horarios.bin") -> Optional[Horarios]:
+    """Horarios cargados una vez por proceso; None si ETF.py todavía no los generó."""
+    if path not in _cargados:
+        try:
+            _cargados[path] = Horarios.cargar(path)
+        except FileNotFoundError:
+            return None
+    return _cargados[path]
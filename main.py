@@ -1,13 +1,91 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from Grafo_Respose import Grafo
-from dkistra import calcular_camino_optimo
+from dkistra import persistir_resultados
 from btree_storage import recuperar_subgrafo, BTreeStore
 from planificacion import planificar_recursos
+from ejecucion import (EjecutorRutas, EscritorSubgrafos, Saturado, TiempoAgotado, PoolCaido, TIMEOUT_SEGUNDOS,
+                       buscar_camino, asignar_en_lote)
+from cache_rutas import CacheRutas, digest_cuerpo, clave_cache
+from estaciones_snapshot import cargar_estaciones
+from metricas import (REGISTRO, ETAPAS, HTTP_SEGUNDOS, GRAFO_NODOS, GRAFO_ARISTAS,
+                      NODOS_ASENTADOS)
+
+
+# El perfil por request (cabecera X-Debug-Profile) solo se habilita a propósito
+PERFIL_HABILITADO = os.environ.get("API_PERFIL_DEBUG", "0") == "1"
+
+
+def persistir(lote: list):
+    # lote: [(origen, destino, clave, resultado, grafo_digest)] juntado por el hilo escritor
+    # Se guarda el digest para saber con qué grafo se calculó cada ruta
+    rutas = [(origen, destino, {**resultado, "grafo_digest": grafo_digest})
+             for origen, destino, _, resultado, grafo_digest in lote if resultado.get("ok")]
+    if rutas:
+        with ETAPAS.cronometrar("guardar_subgrafo"):
+            persistir_resultados(rutas)
+    with ETAPAS.cronometrar("cache_persistir"):
+        for _, _, clave, resultado, _ in lote:
+            cache.persistir(clave, resultado)
+
+
+ejecutor = EjecutorRutas()
+escritor = EscritorSubgrafos(persistir)
+cache = CacheRutas()
+estaciones = None
+
+
+def _metricas_estado():
+    c = cache.estadisticas()
+    e = ejecutor.estado()
+    return [
+        ("cache_rutas_hits_total", "counter", "Aciertos del cache de rutas por nivel.",
+         {(("nivel", "memoria"),): c["hits_memoria"], (("nivel", "disco"),): c["hits_disco"]}),
+        ("cache_rutas_misses_total", "counter", "Fallos del cache de rutas.", {(): c["misses"]}),
+        ("cache_rutas_evictions_total", "counter", "Entradas desalojadas del LRU.", {(): c["evictions"]}),
+        ("cache_rutas_expirados_total", "counter", "Entradas vencidas por TTL.", {(): c["expirados"]}),
+        ("cache_rutas_entradas", "gauge", "Entradas en el LRU en memoria.", {(): c["entradas_memoria"]}),
+        ("cache_rutas_entradas_disco", "gauge", "Entradas en el Árbol B del cache.", {(): c["entradas_disco"]}),
+        ("ejecutor_busquedas_en_curso", "gauge", "Búsquedas corriendo o esperando proceso.", {(): e["en_curso"]}),
+        ("ejecutor_rechazadas_total", "counter", "Búsquedas rechazadas con 429.", {(): e["rechazadas"]}),
+        ("ejecutor_reinicios_total", "counter", "Veces que se recreó el pool por un proceso caído.",
+         {(): e["reinicios"]}),
+        ("escritor_pendientes", "gauge", "Escrituras en cola para el Árbol B.", {(): escritor.pendientes()}),
+        ("escritor_errores_total", "counter", "Escrituras al Árbol B que fallaron.", {(): escritor.errores}),
+        ("escritor_descartados_total", "counter", "Escrituras descartadas por cola llena.",
+         {(): escritor.descartados}),
+    ]
 
 
-app = FastAPI()
+REGISTRO.recolector(_metricas_estado)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global estaciones
+    # El pool primero: se crea antes de que haya otros hilos en el proceso
+    ejecutor.iniciar()
+    escritor.iniciar()
+    # Sin estaciones la API arranca igual; solo /estacion/{id} responde que faltan
+    try:
+        estaciones = cargar_estaciones("estaciones.geojson", "estaciones.bin")
+    except (OSError, ValueError) as e:
+        print(f"[ESTACIONES] No se pudieron cargar: {e}")
+    yield
+    ejecutor.detener()
+    escritor.detener()
+    # Lo que el cache todavía no volcó al archivo (persistir guarda cada intervalo_guardado)
+    cache.volcar()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,22 +95,137 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def medir_solicitud(request: Request, call_next):
+    request.state.inicio = time.perf_counter()
+    response = await call_next(request)
+    # Plantilla de la ruta (no la URL) para no crear una serie por cada clave
+    route = request.scope.get("route")
+    ruta = getattr(route, "path", "otra")
+    HTTP_SEGUNDOS.observar(time.perf_counter() - request.state.inicio, ruta, str(response.status_code))
+    return response
+
+
 class CaminoRequest(BaseModel):
     grafo: dict
     origen: str
     destino: str
+    # Si viene, las coordenadas de las aristas se simplifican para ese zoom del mapa
+    zoom: Optional[int] = None
 
 
 @app.post("/camino_optimo")
-def camino_optimo(data: CaminoRequest):
-    g = Grafo()
-    g.cargar_desde_json(data.grafo)
+async def camino_optimo(data: CaminoRequest, request: Request, response: Response):
+    # Desde que llegó la solicitud hasta acá: lectura del cuerpo, JSON y pydantic
+    ETAPAS.observar(time.perf_counter() - request.state.inicio, "parseo")
+    perfil = PERFIL_HABILITADO and request.headers.get("x-debug-profile") == "1"
+
+    with ETAPAS.cronometrar("cache"):
+        # El cuerpo ya lo leyó FastAPI; sha256 suelta el GIL, así el hilo no frena al event loop
+        digest = await asyncio.to_thread(digest_cuerpo, await request.body())
+        clave = clave_cache(digest, data.origen, data.destino)
+        # Con perfil se recalcula siempre, si no el perfil no mide nada
+        resultado = None if perfil else await asyncio.to_thread(cache.obtener, clave)
+    if resultado is not None:
+        return await _ajustar_zoom(resultado, data.zoom)
+
+    try:
+        resultado, medicion = await ejecutor.ejecutar(buscar_camino, data.grafo, data.origen,
+                                                      data.destino, perfil)
+    except Saturado:
+        return JSONResponse(status_code=429, headers={"Retry-After": "1"},
+                            content={"ok": False, "error": "Servidor ocupado, intente de nuevo."})
+    except TiempoAgotado:
+        return JSONResponse(status_code=504,
+                            content={"ok": False, "error": "La búsqueda del camino tardó demasiado."})
+    except PoolCaido:
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"},
+                            content={"ok": False, "error": "Se reinició el cálculo de rutas, intente de nuevo."})
+
+    cache.guardar(clave, resultado)
+    # Con la cola de escritura llena se responde igual; la escritura queda contada como descartada
+    escritor.encolar(data.origen, data.destino, clave, resultado, medicion["grafo_digest"])
 
-    resultado = calcular_camino_optimo(g, data.origen, data.destino)
-    return resultado
+    for etapa, segundos in medicion["etapas"].items():
+        ETAPAS.observar(segundos, etapa)
+    GRAFO_NODOS.observar(medicion.get("nodos", 0))
+    GRAFO_ARISTAS.observar(medicion.get("aristas", 0))
+    if "nodos_asentados" in medicion:
+        NODOS_ASENTADOS.observar(medicion["nodos_asentados"])
 
+    if perfil:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{etapa};dur={segundos * 1000:.3f}" for etapa, segundos in medicion["etapas"].items())
+        return {**resultado, "perfil": medicion.get("perfil")}
+    return await _ajustar_zoom(resultado, data.zoom)
 
 
+async def _ajustar_zoom(resultado: dict, zoom: Optional[int]) -> dict:
+    # El cache y el Árbol B guardan siempre la geometría completa
+    if zoom is None:
+        return resultado
+    from simplificacion import simplificar_subgrafo
+    return await asyncio.to_thread(simplificar_subgrafo, resultado, zoom)
+
+
+@app.get("/rutas")
+def rutas(zoom: int = 99):
+    """rutas.geojson (de ETF.py) en el nivel de detalle que corresponde al zoom."""
+    from simplificacion import nivel_para_zoom
+    nivel = nivel_para_zoom(zoom)
+    path = "rutas.geojson" if nivel == "completo" else f"rutas_{nivel}.geojson"
+    if not os.path.exists(path):
+        return JSONResponse(status_code=404, content={"ok": False, "error": f"No existe {path}; ejecute ETF.py"})
+    return FileResponse(path, media_type="application/geo+json")
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRO.exponer(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/estado_ejecucion")
+def estado_ejecucion():
+    return {
+        "ok": True,
+        "busquedas": ejecutor.estado(),
+        "escrituras": {
+            "pendientes": escritor.pendientes(),
+            "escritas": escritor.escritos,
+            "errores": escritor.errores,
+            "descartadas": escritor.descartados,
+        },
+    }
+
+
+@app.get("/estadisticas_cache")
+def estadisticas_cache():
+    return {"ok": True, "cache": cache.estadisticas()}
+
+
+@app.get("/estacion/{estacion_id}")
+def estacion(estacion_id: str):
+    if estaciones is None:
+        return JSONResponse(status_code=404,
+                            content={"ok": False, "error": "No existe estaciones.geojson; ejecute ETF.py"})
+    e = estaciones.buscar(estacion_id)
+    if e is None:
+        return {"ok": False, "error": "No existe esa estación"}
+    return {"ok": True, "estacion": e}
+
+
+@app.get("/llegada_temprana")
+def llegada_temprana(origen: str, destino: str, salida: str):
+    """Salir de `origen` a la hora `salida` (HH:MM:SS) y llegar lo antes posible a `destino`."""
+    from horarios import obtener_horarios
+    horarios = obtener_horarios("horarios.bin")
+    if horarios is None:
+        return {"ok": False, "error": "No hay horarios; ejecute ETF.py para generar horarios.bin"}
+    try:
+        return horarios.llegada_mas_temprana(origen, destino, salida)
+    except ValueError:
+        return {"ok": False, "error": "La hora de salida debe tener el formato HH:MM:SS"}
+
 
 @app.get("/rutas_guardadas")
 def rutas_guardadas():
@@ -66,5 +259,31 @@ def ruta_guardada(clave: str):
     return {"ok": True, "ruta": sub}
 
 @app.get("/planificacion_recursos")
-def planificacion_recursos():
-    return planificar_recursos()
+def planificacion_recursos(estrategia: Optional[str] = None):
+    return planificar_recursos(estrategia=estrategia)
+
+
+class AsignacionRequest(BaseModel):
+    grafo: dict
+    # clave "origen->destino" -> demanda; las rutas que no estén usan su flujo_maximo
+    demandas: Optional[Dict[str, float]] = None
+    max_iteraciones: int = 50
+    tiempo_limite: float = 20.0
+
+
+@app.post("/asignacion_capacidad")
+async def asignacion_capacidad(data: AsignacionRequest):
+    # El lote se corta antes del timeout del ejecutor para devolver la mejor solución parcial
+    tiempo_limite = min(data.tiempo_limite, TIMEOUT_SEGUNDOS * 0.8)
+    try:
+        return await ejecutor.ejecutar(asignar_en_lote, data.grafo, "btree_store.json", data.demandas,
+                                       data.max_iteraciones, tiempo_limite)
+    except Saturado:
+        return JSONResponse(status_code=429, headers={"Retry-After": "1"},
+                            content={"ok": False, "error": "Servidor ocupado, intente de nuevo."})
+    except TiempoAgotado:
+        return JSONResponse(status_code=504,
+                            content={"ok": False, "error": "La asignación de capacidad tardó demasiado."})
+    except PoolCaido:
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"},
+                            content={"ok": False, "error": "Se reinició el cálculo de rutas, intente de nuevo."})
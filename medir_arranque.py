@@ -0,0 +1,93 @@
+"""
+Mide el arranque en frío de la API.
+
+ - importar main (proceso nuevo, sin caché de módulos en memoria)
+ - cargar estaciones: parsear estaciones.geojson vs abrir el snapshot mmap
+ - tiempo hasta la primera respuesta: lanzar uvicorn y esperar el primer
+   200 de /estacion/{id}
+
+Uso:
+    python medir_arranque.py [--repeticiones 5] [--puerto 8765]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+
+
+def _medir_en_proceso(codigo: str) -> float:
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True,
+                            check=True, cwd=RAIZ).stdout
+    return float(salida.strip().splitlines()[-1])
+
+
+def medir_import() -> float:
+    return _medir_en_proceso(
+        "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)")
+
+
+def medir_geojson() -> float:
+    return _medir_en_proceso(
+        "import json, time; t = time.perf_counter(); "
+        "json.load(open('estaciones.geojson', encoding='utf-8')); print(time.perf_counter() - t)")
+
+
+def medir_snapshot() -> float:
+    return _medir_en_proceso(
+        "import time; t = time.perf_counter(); "
+        "from estaciones_snapshot import cargar_estaciones; "
+        "e = cargar_estaciones(); e.buscar(e.id(0)); print(time.perf_counter() - t)")
+
+
+def medir_primer_request(puerto: int, timeout: float = 30.0) -> float:
+    with open(RAIZ / "estaciones.geojson", encoding="utf-8") as f:
+        sid = json.load(f)["features"][0]["properties"]["id"]
+    url = f"http://127.0.0.1:{puerto}/estacion/{sid}"
+
+    inicio = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto),
+                             "--log-level", "warning"], cwd=RAIZ)
+    try:
+        while time.perf_counter() - inicio < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("la API no respondió a tiempo")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Garantiza que el snapshot exista antes de medir
+    _medir_en_proceso("from estaciones_snapshot import cargar_estaciones; cargar_estaciones(); print(0)")
+
+    mediciones = {
+        "import main": medir_import,
+        "estaciones: json.load": medir_geojson,
+        "estaciones: snapshot mmap": medir_snapshot,
+        "primer request (uvicorn)": lambda: medir_primer_request(args.puerto),
+    }
+    for nombre, fn in mediciones.items():
+        tiempos = [fn() for _ in range(args.repeticiones)]
+        print(f"{nombre:28s} mediana {statistics.median(tiempos) * 1000:8.1f} ms  "
+              f"(min {min(tiempos) * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Instrumentación liviana de la API: contadores, histogramas y exposición en
+formato de texto de Prometheus (GET /metrics).
+
+No depende de prometheus_client; todas las métricas viven en REGISTRO y son
+seguras entre hilos. Los valores que ya lleva otro objeto (cache, ejecutor)
+se leen al momento del scrape con REGISTRO.recolector().
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_TAMANO = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1, *etiquetas: str) -> None:
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for etq, v in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etq)} {_num(v)}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, buckets: Iterable[float] = BUCKETS_SEGUNDOS,
+                 etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.etiquetas = etiquetas
+        # etiquetas -> [conteos por bucket, suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *etiquetas: str) -> None:
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def cronometrar(self, *etiquetas: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *etiquetas)
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for etq, (conteos, suma, total) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, c in zip(self.buckets, conteos):
+                    acumulado += c
+                    le = f'le="{_num(limite)}"'
+                    lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, etq, le)} {acumulado}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, etq)} {_num(suma)}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, etq)} {total}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas: List = []
+        # Cada recolector devuelve [(nombre, tipo, ayuda, {etiquetas: valor})]
+        self._recolectores: List[Callable[[], list]] = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+        m = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(m)
+        return m
+
+    def histograma(self, nombre: str, ayuda: str, buckets: Iterable[float] = BUCKETS_SEGUNDOS,
+                   etiquetas: Tuple[str, ...] = ()) -> Histograma:
+        m = Histograma(nombre, ayuda, buckets, etiquetas)
+        self._metricas.append(m)
+        return m
+
+    def recolector(self, fn: Callable[[], list]) -> None:
+        self._recolectores.append(fn)
+
+    def exponer(self) -> str:
+        lineas: List[str] = []
+        for m in self._metricas:
+            lineas.extend(m.exponer())
+        for fn in self._recolectores:
+            for nombre, tipo, ayuda, valores in fn():
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for etq, v in valores.items():
+                    etq_txt = "{" + ",".join(f'{k}="{_escapar(x)}"' for k, x in etq) + "}" if etq else ""
+                    lineas.append(f"{nombre}{etq_txt} {_num(v)}")
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
+
+ETAPAS = REGISTRO.histograma(
+    "rutas_etapa_segundos", "Duración de cada etapa de /camino_optimo.", etiquetas=("etapa",))
+HTTP_SEGUNDOS = REGISTRO.histograma(
+    "http_solicitud_segundos", "Latencia de las solicitudes HTTP por ruta.", etiquetas=("ruta", "codigo"))
+GRAFO_NODOS = REGISTRO.histograma(
+    "rutas_grafo_nodos", "Nodos del grafo recibido en /camino_optimo.", BUCKETS_TAMANO)
+GRAFO_ARISTAS = REGISTRO.histograma(
+    "rutas_grafo_aristas", "Aristas del grafo recibido en /camino_optimo.", BUCKETS_TAMANO)
+NODOS_ASENTADOS = REGISTRO.histograma(
+    "rutas_nodos_asentados", "Nodos extraídos del heap por widest_path.", BUCKETS_TAMANO)
+BTREE_BYTES = REGISTRO.contador(
+    "btree_bytes_escritos_total", "Bytes escritos por BTreeStore.save.")
+BTREE_GUARDADOS = REGISTRO.contador(
+    "btree_guardados_total", "Llamadas a BTreeStore.save.")
@@ -1,3 +1,12 @@
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
 from btree_storage import BTreeStore
 
 
@@ -15,37 +24,153 @@ def construir_grafo_conflictos(bt: BTreeStore):
 
     rec(bt.root)
 
-    conflictos = {clave: set() for clave, _ in rutas}
+    # Índice invertido nodo -> rutas que lo usan. Cada conjunto de nodos se
+    # arma una sola vez y solo se comparan rutas que realmente se cruzan.
+    rutas_por_nodo = defaultdict(list)
+    for clave, sub in rutas:
+        for nodo in {n['id'] for n in sub["nodes"]}:
+            rutas_por_nodo[nodo].append(clave)
+
+    return conflictos_desde_indice(rutas_por_nodo, [clave for clave, _ in rutas])
 
-    for i in range(len(rutas)):
-        clave1, sub1 = rutas[i]
-        nodos1 = {n['id'] for n in sub1["nodes"]}
 
-        for j in range(i + 1, len(rutas)):
-            clave2, sub2 = rutas[j]
-            nodos2 = {n['id'] for n in sub2["nodes"]}
+def conflictos_desde_indice(rutas_por_nodo: dict, claves) -> dict:
+    conflictos = {clave: set() for clave in claves}
 
-            if nodos1 & nodos2:  # comparten al menos 1 nodo
-                conflictos[clave1].add(clave2)
-                conflictos[clave2].add(clave1)
+    for rutas in rutas_por_nodo.values():
+        if len(rutas) < 2:
+            continue
+        for clave in rutas:
+            conflictos[clave].update(rutas)
+
+    for clave, vecinos in conflictos.items():
+        vecinos.discard(clave)
 
     return conflictos
 
 
 
+def color_libre(vecinos, colores: dict) -> int:
+    usados = {colores[r] for r in vecinos if r in colores}
+    color = 0
+    while color in usados:
+        color += 1
+    return color
+
+
 def colorear_grafo(conflictos: dict) -> dict:
     colores = {}
 
     for ruta in sorted(conflictos.keys()):
-        usados = {colores[r] for r in conflictos[ruta] if r in colores}
+        colores[ruta] = color_libre(conflictos[ruta], colores)
+
+    return colores
+
+
+# Welsh-Powell: greedy recorriendo las rutas de mayor a menor grado
+def colorear_largest_first(conflictos: dict) -> dict:
+    colores = {}
+
+    for ruta in sorted(conflictos.keys(), key=lambda r: (-len(conflictos[r]), r)):
+        colores[ruta] = color_libre(conflictos[ruta], colores)
+
+    return colores
+
+
+def colorear_dsatur(conflictos: dict) -> dict:
+    """
+    DSATUR: en cada paso se colorea la ruta con más colores distintos entre
+    sus vecinos (saturación), desempatando por grado. Usa un heap con
+    entradas perezosas: una entrada vieja se descarta al sacarla.
+    """
+    colores = {}
+    vistos = {r: set() for r in conflictos}  # colores distintos entre los vecinos
+    heap = [(0, -len(v), r) for r, v in conflictos.items()]
+    heapq.heapify(heap)
+
+    while heap:
+        neg_sat, _, ruta = heapq.heappop(heap)
+        if ruta in colores or -neg_sat != len(vistos[ruta]):
+            continue
         color = 0
-        while color in usados:
+        while color in vistos[ruta]:
             color += 1
         colores[ruta] = color
 
+        for v in conflictos[ruta]:
+            if v in colores or color in vistos[v]:
+                continue
+            vistos[v].add(color)
+            heapq.heappush(heap, (-len(vistos[v]), -len(conflictos[v]), v))
+
     return colores
 
 
+def colorear_jones_plassmann(conflictos: dict, semilla: int = 0) -> dict:
+    """
+    Jones-Plassmann: en cada ronda todas las rutas sin color cuya prioridad
+    (aleatoria) supera a la de sus vecinos sin color forman un conjunto
+    independiente y se colorean a la vez con su menor color libre.
+    Cada ronda es una operación vectorizada de numpy sobre el grafo en CSR.
+    """
+    import numpy as np
+
+    claves = sorted(conflictos.keys())
+    n = len(claves)
+    if n == 0:
+        return {}
+    indice = {c: i for i, c in enumerate(claves)}
+    grados = np.fromiter((len(conflictos[c]) for c in claves), dtype=np.int64, count=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(grados, out=indptr[1:])
+    vecinos = np.fromiter((indice[v] for c in claves for v in conflictos[c]),
+                          dtype=np.int64, count=int(indptr[-1]))
+    origen = np.repeat(np.arange(n), grados)
+
+    prioridad = np.random.default_rng(semilla).permutation(n)
+    color = np.full(n, -1, dtype=np.int64)
+    tiene_vecinos = grados > 0
+
+    while True:
+        sin_color = color < 0
+        if not sin_color.any():
+            break
+
+        # Prioridad máxima entre los vecinos que aún no tienen color
+        prio_vec = np.where(sin_color[vecinos], prioridad[vecinos], -1)
+        max_vec = np.full(n, -1, dtype=np.int64)
+        if len(prio_vec):
+            max_vec[tiene_vecinos] = np.maximum.reduceat(prio_vec, indptr[:-1][tiene_vecinos])
+        elegidos = sin_color & (prioridad > max_vec)
+
+        # Menor color libre (mex) de cada elegido según sus vecinos ya coloreados
+        mascara = elegidos[origen] & (color[vecinos] >= 0)
+        v_arista = origen[mascara]
+        c_arista = color[vecinos[mascara]]
+        mex = np.zeros(n, dtype=np.int64)
+        if len(v_arista):
+            base = int(c_arista.max()) + 2
+            pares = np.unique(v_arista * base + c_arista)
+            v_par, c_par = pares // base, pares % base
+            inicio_grupo = np.flatnonzero(np.r_[True, v_par[1:] != v_par[:-1]])
+            tam_grupo = np.diff(np.r_[inicio_grupo, len(v_par)])
+            rango = np.arange(len(v_par)) - np.repeat(inicio_grupo, tam_grupo)
+            # El mex es el primer rango donde el color no coincide con su posición
+            candidato = np.where(c_par != rango, rango, np.repeat(tam_grupo, tam_grupo))
+            mex[v_par[inicio_grupo]] = np.minimum.reduceat(candidato, inicio_grupo)
+        color[elegidos] = mex[elegidos]
+
+    return {c: int(color[i]) for i, c in enumerate(claves)}
+
+
+ESTRATEGIAS_COLOREO = {
+    "greedy": colorear_grafo,
+    "largest_first": colorear_largest_first,
+    "dsatur": colorear_dsatur,
+    "jones_plassmann": colorear_jones_plassmann,
+}
+
+
 
 FRECUENCIAS = {
     0: "cada 3 minutos",
@@ -62,17 +187,222 @@ def asignar_frecuencias(colores):
     }
 
 
-def planificar_recursos():
-    bt = BTreeStore.load_or_create("btree_store.json")
+class EstadoPlanificacion:
+    """
+    Grafo de conflictos y coloreo mantenidos de forma incremental.
+    Se guarda junto al Árbol B (<store>_planificacion.json) con la firma
+    (mtime, tamaño) del archivo del árbol; si la firma no coincide, el estado
+    se reconstruye completo desde el árbol.
+    guardar() reescribe el archivo de estado completo en cada ruta: el costo
+    crece con el número de rutas, igual que el del propio Árbol B.
+    """
+
+    def __init__(self, store_path: str = "btree_store.json"):
+        self.store_path = store_path
+        base, _ = os.path.splitext(store_path)
+        self.file_path = f"{base}_planificacion.json"
+        self.nodos_por_ruta: Dict[str, Set[str]] = {}
+        self.rutas_por_nodo: Dict[str, Set[str]] = defaultdict(set)
+        self.conflictos: Dict[str, Set[str]] = {}
+        self.colores: Dict[str, int] = {}
+        self.firma: Optional[Tuple[int, int]] = None
+        self._arbol: Optional[BTreeStore] = None
+
+    def arbol(self, t: int = 2) -> BTreeStore:
+        # El Árbol B queda en memoria mientras el estado siga vigente (la firma
+        # coincide con el archivo), así no se vuelve a parsear en cada ruta.
+        if self._arbol is None:
+            self._arbol = BTreeStore.load_or_create(self.store_path, t=t)
+        return self._arbol
+
+    def firma_store(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.store_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def vigente(self) -> bool:
+        return self.firma == self.firma_store()
+
+    def registrar_ruta(self, clave: str, subgrafo: dict) -> None:
+        """Agrega o reemplaza una ruta tocando solo a sus vecinos."""
+        if clave in self.nodos_por_ruta:
+            self._quitar_ruta(clave)
+
+        nodos = {n['id'] for n in subgrafo["nodes"]}
+        vecinos = set()
+        for nodo in nodos:
+            vecinos.update(self.rutas_por_nodo[nodo])
+            self.rutas_por_nodo[nodo].add(clave)
+        vecinos.discard(clave)
+
+        self.nodos_por_ruta[clave] = nodos
+        self.conflictos[clave] = vecinos
+        for v in vecinos:
+            self.conflictos[v].add(clave)
+
+        # Los vecinos ya tenían un coloreo válido entre ellos: basta con
+        # darle a la ruta nueva el menor color que ninguno usa.
+        self.colores[clave] = color_libre(vecinos, self.colores)
+
+    def _quitar_ruta(self, clave: str) -> None:
+        for nodo in self.nodos_por_ruta.pop(clave):
+            rutas = self.rutas_por_nodo[nodo]
+            rutas.discard(clave)
+            if not rutas:
+                del self.rutas_por_nodo[nodo]
+        for v in self.conflictos.pop(clave):
+            self.conflictos[v].discard(clave)
+        self.colores.pop(clave, None)
+
+    def reconstruir(self) -> None:
+        bt = self._arbol = BTreeStore.load_or_create(self.store_path)
+        self.nodos_por_ruta = {}
+        self.rutas_por_nodo = defaultdict(set)
+
+        def rec(n):
+            if n is None:
+                return
+            for k, v in zip(n.keys, n.values):
+                nodos = {x['id'] for x in v["subgrafo"]["nodes"]}
+                self.nodos_por_ruta[k] = nodos
+                for nodo in nodos:
+                    self.rutas_por_nodo[nodo].add(k)
+            if not n.leaf:
+                for c in n.children:
+                    rec(c)
+
+        rec(bt.root)
+        self.conflictos = conflictos_desde_indice(self.rutas_por_nodo, self.nodos_por_ruta)
+        self.colores = colorear_grafo(self.conflictos)
+
+    def guardar(self) -> None:
+        self.firma = self.firma_store()
+        data = {
+            "firma_store": list(self.firma) if self.firma else None,
+            "nodos_por_ruta": {k: sorted(v) for k, v in self.nodos_por_ruta.items()},
+            "colores": self.colores,
+        }
+        texto = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        # Temporal único por escritor: otro proceso puede estar guardando el mismo estado
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_path)),
+                                        prefix=f"{os.path.basename(self.file_path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(texto)
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def cargar(self) -> bool:
+        """Carga el estado guardado; devuelve False si no existe o está desactualizado."""
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        firma = tuple(data["firma_store"]) if data.get("firma_store") else None
+        if firma != self.firma_store():
+            return False
+
+        self.firma = firma
+        self.nodos_por_ruta = {k: set(v) for k, v in data["nodos_por_ruta"].items()}
+        self.rutas_por_nodo = defaultdict(set)
+        for clave, nodos in self.nodos_por_ruta.items():
+            for nodo in nodos:
+                self.rutas_por_nodo[nodo].add(clave)
+        self.conflictos = conflictos_desde_indice(self.rutas_por_nodo, self.nodos_por_ruta)
+        self.colores = data["colores"]
+        return True
+
+
+_estados: Dict[str, EstadoPlanificacion] = {}
+_estados_lock = threading.Lock()
+
+
+def _estado_vigente(store_path: str) -> Tuple[EstadoPlanificacion, bool]:
+    # Debe llamarse con _estados_lock tomado. Devuelve (estado, si hubo que reconstruirlo)
+    estado = _estados.get(store_path)
+    if estado is not None and estado.vigente():
+        return estado, False
+    estado = EstadoPlanificacion(store_path)
+    reconstruido = False
+    if not estado.cargar():
+        estado.reconstruir()
+        estado.guardar()
+        reconstruido = True
+    _estados[store_path] = estado
+    return estado, reconstruido
+
+
+def guardar_ruta(clave: str, resultado: dict, store_path: str = "btree_store.json", t: int = 2) -> None:
+    guardar_rutas([(clave, resultado)], store_path=store_path, t=t)
+
+
+def guardar_rutas(lote: List[Tuple[str, dict]], store_path: str = "btree_store.json", t: int = 2) -> None:
+    """
+    Guarda un lote de rutas en el Árbol B y actualiza el grafo de conflictos
+    y el coloreo solo alrededor de ellas. El árbol y el estado se escriben
+    una sola vez por lote.
+    """
+    with _estados_lock:
+        # Se valida contra el árbol antes de escribir, así un cambio externo
+        # no queda oculto por la firma nueva
+        estado, _ = _estado_vigente(store_path)
+        try:
+            arbol = estado.arbol(t)
+            for clave, resultado in lote:
+                arbol.insert(clave, resultado, guardar=False)
+            arbol.save()
+        except Exception:
+            # El árbol en memoria pudo quedar distinto del archivo: se recarga la próxima vez
+            _estados.pop(store_path, None)
+            raise
+        for clave, resultado in lote:
+            estado.registrar_ruta(clave, resultado["subgrafo"])
+        estado.guardar()
+
+
+def planificar_recursos(store_path: str = "btree_store.json", estrategia: Optional[str] = None):
+    """
+    Sin estrategia se devuelve el coloreo incremental ya calculado.
+    Con una estrategia de ESTRATEGIAS_COLOREO se recolorea el grafo completo.
+    """
+    if estrategia is not None and estrategia not in ESTRATEGIAS_COLOREO:
+        return {"ok": False, "error": f"Estrategia de coloreo desconocida: {estrategia}. "
+                                      f"Opciones: {', '.join(ESTRATEGIAS_COLOREO)}"}
+
+    inicio = time.perf_counter()
+    with _estados_lock:
+        estado, reconstruido = _estado_vigente(store_path)
+        conflictos = {k: set(v) for k, v in estado.conflictos.items()}
+        colores = dict(estado.colores)
+    t_estado = time.perf_counter() - inicio
+
+    t_coloreo = 0.0
+    if estrategia is not None:
+        inicio = time.perf_counter()
+        colores = ESTRATEGIAS_COLOREO[estrategia](conflictos)
+        t_coloreo = time.perf_counter() - inicio
 
-    conflictos = construir_grafo_conflictos(bt)
-    colores = colorear_grafo(conflictos)
     frecuencias = asignar_frecuencias(colores)
 
     return {
         "ok": True,
         "conflictos": {k: list(v) for k, v in conflictos.items()},
         "colores": colores,
-        "frecuencias": frecuencias
+        "frecuencias": frecuencias,
+        "estadisticas": {
+            "rutas": len(conflictos),
+            "aristas_conflicto": sum(len(v) for v in conflictos.values()) // 2,
+            "colores_usados": len(set(colores.values())),
+            "estrategia": estrategia or "incremental",
+            "reconstruido": reconstruido,
+            # Tomar el lock y copiar el estado (más la reconstrucción si reconstruido);
+            # no es comparable con construir_grafo_conflictos
+            "ms_estado": round(t_estado * 1000, 3),
+            "ms_coloreo": round(t_coloreo * 1000, 3),
+        }
     }
-
@@ -0,0 +1,147 @@
+"""
+Simplificación de geometrías de rutas por nivel de detalle (LOD).
+
+ - douglas_peucker: versión iterativa; en cada tramo la distancia de todos
+   los puntos intermedios al segmento se calcula de una vez con numpy.
+ - visvalingam: elimina el vértice de menor área efectiva hasta que todos
+   superan el umbral; las áreas iniciales se calculan vectorizadas.
+
+Las tolerancias están en grados (coordenadas lon/lat tal como vienen en el
+GeoJSON); 0.00001° son ~1.1 m en Bogotá.
+"""
+
+import heapq
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# (zoom máximo del nivel, nombre, tolerancia en grados). El último nivel no simplifica.
+NIVELES_LOD = [
+    (11, "z11", 0.0005),    # ~55 m, vista de ciudad
+    (13, "z13", 0.0001),    # ~11 m, localidad
+    (15, "z15", 0.00002),   # ~2 m, barrio
+    (99, "completo", 0.0),
+]
+DECIMALES = 6  # ~0.1 m, suficiente para un mapa
+
+
+def nivel_para_zoom(zoom: int) -> str:
+    for zoom_max, nombre, _ in NIVELES_LOD:
+        if zoom <= zoom_max:
+            return nombre
+    return NIVELES_LOD[-1][1]
+
+
+def tolerancia_para_zoom(zoom: int) -> float:
+    for zoom_max, _, tol in NIVELES_LOD:
+        if zoom <= zoom_max:
+            return tol
+    return 0.0
+
+
+def douglas_peucker(puntos: np.ndarray, tolerancia: float) -> np.ndarray:
+    """Devuelve la máscara booleana de los puntos que se conservan."""
+    n = len(puntos)
+    conservar = np.zeros(n, dtype=bool)
+    if n == 0:
+        return conservar
+    conservar[0] = conservar[-1] = True
+    if n < 3 or tolerancia <= 0:
+        conservar[:] = True
+        return conservar
+
+    pila = [(0, n - 1)]
+    while pila:
+        i, j = pila.pop()
+        if j - i < 2:
+            continue
+        a, b = puntos[i], puntos[j]
+        intermedios = puntos[i + 1:j]
+        ab = b - a
+        largo = np.hypot(ab[0], ab[1])
+        if largo == 0:
+            dist = np.hypot(intermedios[:, 0] - a[0], intermedios[:, 1] - a[1])
+        else:
+            # |AB x AP| / |AB|
+            dist = np.abs(ab[0] * (intermedios[:, 1] - a[1]) - ab[1] * (intermedios[:, 0] - a[0])) / largo
+        k = int(np.argmax(dist))
+        if dist[k] > tolerancia:
+            m = i + 1 + k
+            conservar[m] = True
+            pila.append((i, m))
+            pila.append((m, j))
+    return conservar
+
+
+def _areas(puntos: np.ndarray) -> np.ndarray:
+    # Área del triángulo (p[i-1], p[i], p[i+1]) para cada vértice interior
+    a, b, c = puntos[:-2], puntos[1:-1], puntos[2:]
+    return 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+
+
+def visvalingam(puntos: np.ndarray, tolerancia: float) -> np.ndarray:
+    """
+    Máscara de puntos que se conservan. El umbral de área es tolerancia²,
+    para que la misma tolerancia dé resultados comparables con Douglas-Peucker.
+    """
+    n = len(puntos)
+    conservar = np.ones(n, dtype=bool)
+    if n < 3 or tolerancia <= 0:
+        return conservar
+    umbral = tolerancia * tolerancia
+
+    areas = np.full(n, np.inf)
+    areas[1:-1] = _areas(puntos)
+    anterior = np.arange(-1, n - 1)
+    siguiente = np.arange(1, n + 1)
+    heap = [(areas[i], i) for i in np.flatnonzero(areas < umbral)]
+    heapq.heapify(heap)
+
+    def area(i: int) -> float:
+        p, s = anterior[i], siguiente[i]
+        if p < 0 or s >= n:
+            return np.inf
+        a, b, c = puntos[p], puntos[i], puntos[s]
+        return 0.5 * abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1]))
+
+    while heap:
+        ar, i = heapq.heappop(heap)
+        if not conservar[i] or ar != areas[i]:
+            continue
+        conservar[i] = False
+        p, s = anterior[i], siguiente[i]
+        siguiente[p] = s
+        anterior[s] = p
+        # Visvalingam-Whyatt: el área de un vecino nunca baja de la del punto eliminado
+        for v in (p, s):
+            if 0 < v < n - 1:
+                areas[v] = max(area(v), ar)
+                if areas[v] < umbral:
+                    heapq.heappush(heap, (areas[v], v))
+    return conservar
+
+
+METODOS = {"douglas_peucker": douglas_peucker, "visvalingam": visvalingam}
+
+
+def simplificar_coordenadas(coords: Sequence[Sequence[float]], tolerancia: float,
+                            metodo: str = "douglas_peucker", decimales: int = DECIMALES) -> List[List[float]]:
+    if len(coords) == 0:
+        return []
+    puntos = np.asarray(coords, dtype=float)
+    mascara = METODOS[metodo](puntos, tolerancia)
+    return np.round(puntos[mascara], decimales).tolist()
+
+
+def simplificar_subgrafo(resultado: Dict[str, Any], zoom: int) -> Dict[str, Any]:
+    """Copia del resultado de /camino_optimo con las coordenadas de cada arista simplificadas."""
+    if not resultado.get("ok"):
+        return resultado
+    tol = tolerancia_para_zoom(zoom)
+    edges = []
+    for e in resultado.get("subgrafo", {}).get("edges", []):
+        raw = e.get("raw")
+        if raw and raw.get("coordinates"):
+            e = {**e, "raw": {**raw, "coordinates": simplificar_coordenadas(raw["coordinates"], tol)}}
+        edges.append(e)
+    return {**resultado, "subgrafo": {**resultado["subgrafo"], "edges": edges}}
@@ -0,0 +1,127 @@
+"""
+Verificaciones de corrección contra soluciones de fuerza bruta.
+
+ - coloreo: cada estrategia de ESTRATEGIAS_COLOREO debe dar un coloreo
+   propio (todas las rutas con color y ninguna ruta con el mismo color que
+   una vecina) sobre grafos de conflictos aleatorios.
+ - horarios: Horarios.llegada_mas_temprana (Connection Scan) debe dar la
+   misma llegada que relajar todas las conexiones hasta que nada cambie,
+   sobre un feed GTFS sintético de generador_sintetico.py.
+
+Uso:
+    python verificar.py [--consultas 300] [--semilla 0]
+Termina con código 1 si alguna verificación falla.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+
+from planificacion import ESTRATEGIAS_COLOREO, conflictos_desde_indice
+
+
+def conflictos_aleatorios(n_rutas: int, rnd: random.Random) -> dict:
+    # Cada ruta pasa por 5 paraderos al azar; las que comparten uno quedan en conflicto
+    rutas_por_nodo = {}
+    claves = [f"R{i}" for i in range(n_rutas)]
+    for clave in claves:
+        for _ in range(5):
+            rutas_por_nodo.setdefault(rnd.randrange(2 * n_rutas + 1), []).append(clave)
+    return conflictos_desde_indice(rutas_por_nodo, claves)
+
+
+def verificar_coloreo(semilla: int) -> list:
+    rnd = random.Random(semilla)
+    errores = []
+    for n in (0, 1, 2, 50, 500, 2000):
+        conflictos = conflictos_aleatorios(n, rnd)
+        for nombre, fn in ESTRATEGIAS_COLOREO.items():
+            colores = fn(conflictos)
+            if set(colores) != set(conflictos):
+                errores.append(f"coloreo {nombre}, {n} rutas: no colorea todas las rutas")
+                continue
+            choques = [(a, b) for a, vecinos in conflictos.items() for b in vecinos if colores[a] == colores[b]]
+            if choques:
+                errores.append(f"coloreo {nombre}, {n} rutas: {choques[0][0]} y {choques[0][1]} comparten color")
+    return errores
+
+
+def llegada_fuerza_bruta(h, o: int, d: int, t0: int, horizonte: int) -> int:
+    # Sin orden ni cortes: se relajan todas las conexiones de la ventana hasta un punto fijo
+    from horarios import INF
+
+    mejor = [INF] * len(h.paradas)
+    mejor[o] = t0
+    conexiones = [(h.desde[c], h.hasta[c], h.salida[c], h.llegada[c])
+                  for c in range(len(h)) if t0 <= h.salida[c] < t0 + horizonte]
+    cambio = True
+    while cambio:
+        cambio = False
+        for desde, hasta, salida, llegada in conexiones:
+            if mejor[desde] <= salida and llegada < mejor[hasta]:
+                mejor[hasta] = llegada
+                cambio = True
+    return mejor[d]
+
+
+def verificar_tramos(h, origen: str, destino: str, t0: int, r: dict) -> str:
+    from horarios import a_segundos
+
+    parada, hora = origen, t0
+    for tramo in r["tramos"]:
+        if tramo["desde"] != parada or a_segundos(tramo["salida"]) < hora:
+            return f"tramo {tramo} no sigue a {parada} {hora}"
+        parada, hora = tramo["hasta"], a_segundos(tramo["llegada"])
+    if parada != destino or hora != t0 + r["duracion_segundos"]:
+        return f"los tramos terminan en {parada} a las {hora}"
+    return ""
+
+
+def verificar_horarios(consultas: int, semilla: int) -> list:
+    import ETF
+    from generador_sintetico import generar_gtfs
+    from horarios import INF, HORIZONTE_SEGUNDOS, a_segundos, construir_horarios
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        generar_gtfs(carpeta, n_paradas=400, n_rutas=40, paradas_por_ruta=20, viajes_por_ruta=6, semilla=semilla)
+        _, _, trips, stop_times, _ = ETF.cargar_gtfs(carpeta)
+    h = construir_horarios(stop_times, trips)
+
+    rnd = random.Random(semilla)
+    errores = []
+    for _ in range(consultas):
+        o, d = rnd.randrange(len(h.paradas)), rnd.randrange(len(h.paradas))
+        t0 = 5 * 3600 + rnd.randrange(2 * 3600)
+        origen, destino = h.paradas[o], h.paradas[d]
+        r = h.llegada_mas_temprana(origen, destino, t0)
+        esperado = llegada_fuerza_bruta(h, o, d, t0, HORIZONTE_SEGUNDOS)
+        obtenido = a_segundos(r["llegada"]) if r["ok"] else INF
+        if obtenido != esperado:
+            errores.append(f"horarios {origen}->{destino} {t0}: CSA {obtenido}, fuerza bruta {esperado}")
+        elif r["ok"]:
+            problema = verificar_tramos(h, origen, destino, t0, r)
+            if problema:
+                errores.append(f"horarios {origen}->{destino} {t0}: {problema}")
+    return errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consultas", type=int, default=300, help="consultas de llegada más temprana")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    errores = verificar_coloreo(args.semilla)
+    print(f"Coloreo: {len(ESTRATEGIAS_COLOREO)} estrategias, {len(errores)} errores")
+    errores_horarios = verificar_horarios(args.consultas, args.semilla)
+    print(f"Horarios: {args.consultas} consultas, {len(errores_horarios)} errores")
+
+    errores += errores_horarios
+    for e in errores[:20]:
+        print(f"  {e}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()